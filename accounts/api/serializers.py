@@ -219,6 +219,12 @@ class LinkedinAccountRetrieveSerializer(serializers.ModelSerializer):
             "profile_url",
             "connected",
             "auto_accept_connection_requests_last_ran",
+            "connections_cursor_url",
+            "connections_cursor_created_at",
+            "connections_reconciled_at",
+            "messages_synced_until",
+            "messages_backfill_before",
+            "messages_backfill_until",
             "profile_urn",
             "proxy",
         )
@@ -1,7 +1,6 @@
 from accounts.models import ImportLinkedinAccount, LinkedinAccount, UserProfile
 from base.models import Country
 from seleniumwire import webdriver
-from webdriver_manager.chrome import ChromeDriverManager
 from django.conf import settings
 from base.utils import start_driver, give_totally_random_number_in_float, chooseRandomly, waitRandomly
 from accounts.api.utils import connect_linkedin_account_with_automatic_verification
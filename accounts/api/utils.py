@@ -6,7 +6,8 @@ from selenium.common import exceptions
 from time import sleep
 from django.conf import settings
 import smtplib
-from base.utils import give_totally_random_number_in_float, chooseRandomly, waitRandomly, get_avatar, load_cookie, save_cookie, start_driver, get_proxy_options, start_kameleo
+from base.utils import give_totally_random_number_in_float, chooseRandomly, waitRandomly, get_avatar, load_cookie, save_cookie, start_driver, start_kameleo
+from base.voyager import VOYAGER_API, get_voyager_client
 from accounts.models import LinkedinAccount
 from rest_framework_simplejwt.tokens import RefreshToken
 import re
@@ -14,7 +15,6 @@ from imap_tools import MailBox, A
 from datetime import date, timedelta
 from django.utils import timezone
 import requests
-from http.cookies import SimpleCookie
 
 
 def check_if_proxy_works(proxy):
@@ -127,15 +127,10 @@ def connect_your_linkedin_with_verification_code(request, verification_code, lin
         linkedin_account.save()
         
         profile_id = linkedin_account.linkedin_profile_id
-        profile_url_for_profile_urn = f'https://www.linkedin.com/voyager/api/identity/dash/profiles?q=memberIdentity&memberIdentity={profile_id}&decorationId=com.linkedin.voyager.dash.deco.identity.profile.TopCardSupplementary-106'
-        cookie = SimpleCookie()
-        cookie.load(linkedin_account.header_cookie)
-        cookies = {k: v.value for k, v in cookie.items()}
-        headers = { "Csrf-Token": linkedin_account.header_csrf_token }
-        proxies = get_proxy_options(linkedin_account.proxy)["proxy"] if linkedin_account.proxy else {}
+        profile_url_for_profile_urn = f'{VOYAGER_API}/identity/dash/profiles?q=memberIdentity&memberIdentity={profile_id}&decorationId=com.linkedin.voyager.dash.deco.identity.profile.TopCardSupplementary-106'
         
         ####################################### profile_urn ################################
-        resp = requests.get(profile_url_for_profile_urn, cookies=cookies, headers=headers, proxies=proxies)
+        resp = get_voyager_client(linkedin_account).get(profile_url_for_profile_urn)
         profile_urn_json = resp.json()
         profile_urn = profile_urn_json["elements"][0]["entityUrn"]
         linkedin_account.profile_urn = profile_urn
@@ -242,15 +237,10 @@ def connect_your_linkedin(request, username, password, timezone, from_hour, to_h
             linkedin_account = LinkedinAccount.objects.create(**data)
         
         profile_id = linkedin_account.linkedin_profile_id
-        profile_url_for_profile_urn = f'https://www.linkedin.com/voyager/api/identity/dash/profiles?q=memberIdentity&memberIdentity={profile_id}&decorationId=com.linkedin.voyager.dash.deco.identity.profile.TopCardSupplementary-106'
-        cookie = SimpleCookie()
-        cookie.load(linkedin_account.header_cookie)
-        cookies = {k: v.value for k, v in cookie.items()}
-        headers = { "Csrf-Token": linkedin_account.header_csrf_token }
-        proxies = get_proxy_options(proxy)["proxy"] if proxy else {}
+        profile_url_for_profile_urn = f'{VOYAGER_API}/identity/dash/profiles?q=memberIdentity&memberIdentity={profile_id}&decorationId=com.linkedin.voyager.dash.deco.identity.profile.TopCardSupplementary-106'
         
         ####################################### profile_urn ################################
-        resp = requests.get(profile_url_for_profile_urn, cookies=cookies, headers=headers, proxies=proxies)
+        resp = get_voyager_client(linkedin_account).get(profile_url_for_profile_urn)
         profile_urn_json = resp.json()
         profile_urn = profile_urn_json["elements"][0]["entityUrn"]
         linkedin_account.profile_urn = profile_urn
@@ -523,15 +513,10 @@ def connect_linkedin_account_with_automatic_verification(driver, row, userprofil
         )
         
         profile_id = linkedin_account.linkedin_profile_id
-        profile_url_for_profile_urn = f'https://www.linkedin.com/voyager/api/identity/dash/profiles?q=memberIdentity&memberIdentity={profile_id}&decorationId=com.linkedin.voyager.dash.deco.identity.profile.TopCardSupplementary-106'
-        cookie = SimpleCookie()
-        cookie.load(linkedin_account.header_cookie)
-        cookies = {k: v.value for k, v in cookie.items()}
-        headers = { "Csrf-Token": linkedin_account.header_csrf_token }
-        proxies = get_proxy_options(proxy)["proxy"] if proxy else {}
+        profile_url_for_profile_urn = f'{VOYAGER_API}/identity/dash/profiles?q=memberIdentity&memberIdentity={profile_id}&decorationId=com.linkedin.voyager.dash.deco.identity.profile.TopCardSupplementary-106'
         
         ####################################### profile_urn ################################
-        resp = requests.get(profile_url_for_profile_urn, cookies=cookies, headers=headers, proxies=proxies)
+        resp = get_voyager_client(linkedin_account).get(profile_url_for_profile_urn)
         print(resp.content)
         profile_urn_json = resp.json()
         profile_urn = profile_urn_json["elements"][0]["entityUrn"]
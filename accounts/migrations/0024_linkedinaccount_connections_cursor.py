@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_auto_20220917_0038'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linkedinaccount',
+            name='connections_cursor_created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='linkedinaccount',
+            name='connections_cursor_url',
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='linkedinaccount',
+            name='connections_reconciled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
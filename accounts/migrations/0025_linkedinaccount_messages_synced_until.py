@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_linkedinaccount_connections_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linkedinaccount',
+            name='messages_synced_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
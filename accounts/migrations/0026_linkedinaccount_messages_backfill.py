@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_linkedinaccount_messages_synced_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linkedinaccount',
+            name='messages_backfill_before',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='linkedinaccount',
+            name='messages_backfill_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -129,6 +129,15 @@ class LinkedinAccount(models.Model):
     cookies_file_path = models.CharField(max_length=2000)
     auto_accept_connection_requests = models.BooleanField(default = False)
     auto_accept_connection_requests_last_ran = models.DateTimeField(blank = True, null = True)
+    # newest connection seen by check_user_connections, the hourly sync stops once it gets back to it
+    connections_cursor_url = models.URLField(blank = True, null = True)
+    connections_cursor_created_at = models.DateTimeField(blank = True, null = True)
+    connections_reconciled_at = models.DateTimeField(blank = True, null = True)
+    # last activity of the newest conversation of the last complete voyager messaging sync
+    messages_synced_until = models.DateTimeField(blank = True, null = True)
+    # conversations a capped sync didn't get to, read back from before (lastActivityAt in ms) down to until
+    messages_backfill_before = models.BigIntegerField(blank = True, null = True)
+    messages_backfill_until = models.DateTimeField(blank = True, null = True)
     working_days = MultiSelectField(choices = week_days, default=[0,1,2,3,4])
     from_hour = models.TimeField(default=time(9, 0))
     to_hour = models.TimeField(default=time(18, 0))
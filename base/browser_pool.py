@@ -0,0 +1,155 @@
+import atexit
+import json
+from threading import Lock, current_thread
+from time import monotonic
+from django.conf import settings
+from celery.signals import worker_process_shutdown
+from selenium.common import exceptions
+from .utils import start_driver
+
+
+class PooledBrowser:
+
+    def __init__(self, key, driver):
+        self.key = key
+        self.driver = driver
+        self.owner = None
+        self.last_used_at = monotonic()
+
+    @property
+    def in_use(self):
+        # the owner of a browser that was never released is either finished or back for a new task
+        return self.owner is not None and self.owner.is_alive() and self.owner is not current_thread()
+
+
+_browsers = {}
+_lock = Lock()
+
+
+def get_browser_key(linkedin_account):
+    return (linkedin_account.id, json.dumps(linkedin_account.get_proxy, sort_keys=True, default=str))
+
+
+def quit_browser(browser):
+
+    try:
+        browser.driver.quit()
+    except Exception as e:
+        print(f"Browser didn't quit cleanly: {e}")
+
+
+def get_memory_usage(driver):
+    ''' JS heap of the open page in MB, chrome only '''
+
+    try:
+        return (driver.execute_script("return performance.memory && performance.memory.usedJSHeapSize") or 0) / 1024 / 1024
+    except exceptions.WebDriverException:
+        return 0
+
+
+def is_healthy(driver):
+    ''' Cheap enough to run on every checkout: the browser still answers and the linkedin session cookie is there '''
+
+    try:
+        driver.execute_script("return document.readyState")
+        return driver.get_cookie("li_at") is not None
+    except exceptions.WebDriverException:
+        return False
+
+
+def evict_browsers():
+    ''' Quits browsers idle for too long, heavy on memory or above the pool size, least recently used first '''
+
+    now = monotonic()
+    evicted = []
+
+    with _lock:
+        idle = sorted((browser for browser in _browsers.values() if not browser.in_use), key=lambda browser: browser.last_used_at)
+
+        for browser in idle:
+            if (
+                len(_browsers) > settings.BROWSER_POOL_MAX_SIZE or
+                now - browser.last_used_at > settings.BROWSER_POOL_IDLE_SECONDS or
+                get_memory_usage(browser.driver) > settings.BROWSER_POOL_MAX_MEMORY_MB
+            ):
+                evicted.append(_browsers.pop(browser.key))
+
+    for browser in evicted:
+        print(f"Evicting browser of linkedin account {browser.key[0]}")
+        quit_browser(browser)
+
+
+def acquire_driver(linkedin_account, action_to_do_if_cookie_failed=None, action="Default"):
+    ''' Same contract as start_driver, but a warm browser of the account and proxy is handed out when there is one '''
+
+    key = get_browser_key(linkedin_account)
+
+    with _lock:
+        browser = _browsers.get(key)
+
+        if browser is not None and browser.in_use:
+            browser = None
+        elif browser is not None:
+            browser.owner = current_thread()
+
+    if browser is not None:
+
+        if is_healthy(browser.driver):
+            print(f"Reusing browser of linkedin account {linkedin_account.id} for {action}")
+            return browser.driver, True
+
+        with _lock:
+            _browsers.pop(key, None)
+
+        quit_browser(browser)
+
+    evict_browsers()
+
+    driver, success = start_driver(linkedin_account, action_to_do_if_cookie_failed, action)
+
+    if success:
+        browser = PooledBrowser(key, driver)
+        browser.owner = current_thread()
+
+        with _lock:
+            # another task of the same account got its own browser meanwhile, only one of them is kept warm
+            if key not in _browsers:
+                _browsers[key] = browser
+
+    return driver, success
+
+
+def release_driver(driver, discard=False):
+    ''' Hands the browser back to the pool instead of quitting it, anything that isn't pooled is quit '''
+
+    if isinstance(driver, str):
+        return
+
+    with _lock:
+        browser = next((browser for browser in _browsers.values() if browser.driver is driver), None)
+
+        if browser is not None and discard:
+            _browsers.pop(browser.key)
+        elif browser is not None:
+            browser.owner = None
+            browser.last_used_at = monotonic()
+
+    if browser is None or discard:
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Browser didn't quit cleanly: {e}")
+
+    evict_browsers()
+
+
+@atexit.register
+@worker_process_shutdown.connect
+def close_browsers(*args, **kwargs):
+
+    with _lock:
+        browsers = list(_browsers.values())
+        _browsers.clear()
+
+    for browser in browsers:
+        quit_browser(browser)
@@ -4,6 +4,8 @@ from django.conf import settings
 # from selenium import webdriver
 from seleniumwire import webdriver
 from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.utils import ChromeType, get_browser_version_from_os
+import json
 from time import sleep
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -20,6 +22,20 @@ from kameleo.local_api_client.builder_for_create_profile import BuilderForCreate
 from kameleo.local_api_client.models.server_py3 import Server
 from kameleo.local_api_client.models.problem_response_py3 import ProblemResponseException
 from selenium import webdriver as sel_webdriver
+import redis
+
+
+_redis = None
+
+
+def get_redis():
+    ''' Shared client of settings.REDIS_URL, None when it isn't configured '''
+    global _redis
+
+    if _redis is None and settings.REDIS_URL:
+        _redis = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=settings.TIMEOUT, socket_connect_timeout=settings.TIMEOUT)
+
+    return _redis
 
 
 def give_totally_random_number_in_float(min_=4, max_=7):
@@ -94,6 +110,69 @@ def get_proxy_options(proxy):
     # }
 
 
+_chromedriver_path = None
+
+
+def get_chromedriver_path(refresh=False):
+    ''' ChromeDriverManager().install() only when the installed chrome changes, the resolved path is kept on disk
+        so new worker processes skip the version lookups and keep working without network '''
+    global _chromedriver_path
+
+    if _chromedriver_path and not refresh and os.path.exists(_chromedriver_path):
+        return _chromedriver_path
+
+    try:
+        chrome_version = get_browser_version_from_os(ChromeType.GOOGLE)
+    except Exception as e:
+        print(f"Chrome version couldn't be read: {e}")
+        chrome_version = None
+
+    cached = {}
+
+    if os.path.exists(settings.CHROMEDRIVER_CACHE_FILE):
+        try:
+            with open(settings.CHROMEDRIVER_CACHE_FILE) as cache_file:
+                cached = json.load(cache_file)
+        except (OSError, ValueError):
+            cached = {}
+
+    cached_path = cached.get("path")
+    cached_path_exists = bool(cached_path) and os.path.exists(cached_path)
+
+    if cached_path_exists and not refresh and (chrome_version is None or cached.get("chrome_version") == chrome_version):
+        _chromedriver_path = cached_path
+        return _chromedriver_path
+
+    try:
+        _chromedriver_path = ChromeDriverManager().install()
+    except Exception as e:
+        if not cached_path_exists:
+            raise
+
+        print(f"Chromedriver couldn't be resolved, using the cached one: {e}")
+        _chromedriver_path = cached_path
+        return _chromedriver_path
+
+    create_a_dir_if_it_doesnot_exist(os.path.dirname(settings.CHROMEDRIVER_CACHE_FILE))
+    temporary_path = f"{settings.CHROMEDRIVER_CACHE_FILE}.{os.getpid()}"
+
+    with open(temporary_path, "w") as cache_file:
+        json.dump({"chrome_version": chrome_version, "path": _chromedriver_path}, cache_file)
+
+    os.replace(temporary_path, settings.CHROMEDRIVER_CACHE_FILE)
+
+    return _chromedriver_path
+
+
+def start_chrome(**kwargs):
+
+    try:
+        return webdriver.Chrome(get_chromedriver_path(), **kwargs)
+    except exceptions.SessionNotCreatedException:
+        # chrome was updated under a running worker
+        return webdriver.Chrome(get_chromedriver_path(refresh=True), **kwargs)
+
+
 def start_kameleo(proxy=None):
     client = KameleoLocalApiClient(settings.KAMELEO_HOST)
     base_profiles = client.search_base_profiles(
@@ -132,11 +211,11 @@ def start_driver(linkedin_account=None, action_to_do_if_cookie_failed=None, acti
         return "No Proxy is Supplied", False
     
     if proxy:
-        driver = webdriver.Chrome(ChromeDriverManager().install(), options=settings.DRIVER_OPTIONS, seleniumwire_options=get_proxy_options(proxy or linkedin_account.get_proxy))
+        driver = start_chrome(options=settings.DRIVER_OPTIONS, seleniumwire_options=get_proxy_options(proxy or linkedin_account.get_proxy))
     elif linkedin_account:
-        driver = webdriver.Chrome(ChromeDriverManager().install(), options=settings.DRIVER_OPTIONS, seleniumwire_options=get_proxy_options(linkedin_account.get_proxy))
+        driver = start_chrome(options=settings.DRIVER_OPTIONS, seleniumwire_options=get_proxy_options(linkedin_account.get_proxy))
     else:
-        driver = webdriver.Chrome(ChromeDriverManager().install(), options=settings.DRIVER_OPTIONS)
+        driver = start_chrome(options=settings.DRIVER_OPTIONS)
         
     stealth(driver,
         languages=["en-US", "en"],
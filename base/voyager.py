@@ -0,0 +1,78 @@
+from http.cookies import SimpleCookie
+from threading import Lock
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .utils import get_proxy_options
+
+
+VOYAGER_API = "https://www.linkedin.com/voyager/api"
+
+_clients = {}
+_clients_lock = Lock()
+
+
+def get_cookies(header_cookie):
+    cookie = SimpleCookie()
+    cookie.load(header_cookie or "")
+
+    return {k: v.value for k, v in cookie.items()}
+
+
+class VoyagerClient:
+    ''' Keep-alive session of a linkedin account for the voyager api, with its cookies, csrf token and proxy.
+        Throttled and failing GETs are retried with backoff, POSTs are sent once. '''
+
+    def __init__(self):
+        retry = Retry(
+            total=settings.VOYAGER_RETRIES,
+            backoff_factor=settings.VOYAGER_BACKOFF_FACTOR,
+            status_forcelist=(429, 500, 502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=settings.VOYAGER_POOL_SIZE, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.header_cookie = None
+
+    def configure(self, linkedin_account):
+        ''' The account may have been reconnected since the client was made, the cookies are only parsed on changes '''
+
+        if linkedin_account.header_cookie != self.header_cookie:
+            self.session.cookies.clear()
+            self.session.cookies.update(get_cookies(linkedin_account.header_cookie))
+            self.header_cookie = linkedin_account.header_cookie
+
+        self.session.headers["Csrf-Token"] = linkedin_account.header_csrf_token or ""
+        self.session.proxies = dict(get_proxy_options(linkedin_account.proxy)["proxy"])
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", settings.TIMEOUT)
+
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get_json(self, url, **kwargs):
+        return self.get(url, **kwargs).json()
+
+
+def get_voyager_client(linkedin_account):
+    ''' One client per linkedin account and worker process, so its connections are reused between calls and tasks '''
+
+    with _clients_lock:
+        client = _clients.get(linkedin_account.id)
+
+        if client is None:
+            client = _clients[linkedin_account.id] = VoyagerClient()
+
+        client.configure(linkedin_account)
+
+    return client
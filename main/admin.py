@@ -1,6 +1,6 @@
 import imp
 from django.contrib import admin
-from .models import Campaign, CampaignSequence, CampaignLinkedinAccount, Prospect, SearchParameter, CampaignFailedReason, UserLinkedinConnection, CeleryJob, Message, Room, Label, ProspectLabel, ProspectActionLog, CeleryJobsLog, PostSequence, EngagementCampaignPost, UserLinkedinGroup, Label
+from .models import Campaign, CampaignStats, ProfileSnapshot, CampaignSequence, CampaignLinkedinAccount, Prospect, SearchParameter, CampaignFailedReason, UserLinkedinConnection, CeleryJob, Message, Room, Label, ProspectLabel, ProspectActionLog, CeleryJobsLog, PostSequence, EngagementCampaignPost, UserLinkedinGroup, Label
 
 # Register your models here.
 
@@ -88,4 +88,6 @@ admin.site.register(CeleryJobsLog)
 admin.site.register(PostSequence)
 admin.site.register(EngagementCampaignPost)
 admin.site.register(UserLinkedinGroup)
-admin.site.register(Label)
\ No newline at end of file
+admin.site.register(Label)
+admin.site.register(CampaignStats)
+admin.site.register(ProfileSnapshot)
\ No newline at end of file
@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+import requests
+from main.models import Prospect
+
+
+def is_downloadable(url):
+    return bool(url) and url.startswith("http")
+
+
+def download_avatar(url):
+    ''' Content of the image, None when it can't be had within the timeout '''
+
+    try:
+        response = requests.get(url, timeout=settings.TIMEOUT)
+    except requests.RequestException as e:
+        print(f"Avatar download failed: {e}")
+        return None
+
+    if response.status_code != requests.codes.ok:
+        return None
+
+    return response.content
+
+
+def store_avatar(content):
+    ''' Files are named after their content, so the same picture is stored once whoever it belongs to '''
+
+    name = f"avatars/{sha256(content).hexdigest()}.jpg"
+
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+
+    return name
+
+
+def fetch_avatars(avatars):
+    ''' Sets the avatars of [(prospect_id, source_url)]. A source url already stored, on the prospect or on anyone
+        else, isn't downloaded again, the rest is downloaded at the same time up to AVATAR_DOWNLOAD_CONCURRENCY. '''
+
+    avatars = {prospect_id: url for prospect_id, url in avatars if is_downloadable(url)}
+    prospects = list(Prospect.objects.filter(id__in=avatars).only("id", "linkedin_avatar", "linkedin_avatar_source_url", "updated_at"))
+    prospects = [
+        prospect for prospect in prospects
+        if not (prospect.linkedin_avatar and prospect.linkedin_avatar_source_url == avatars[prospect.id])
+    ]
+
+    if not prospects:
+        return 0
+
+    urls = {avatars[prospect.id] for prospect in prospects}
+    names = dict(
+        Prospect.objects.filter(linkedin_avatar_source_url__in=urls).exclude(linkedin_avatar="").exclude(
+            linkedin_avatar__isnull=True).values_list("linkedin_avatar_source_url", "linkedin_avatar")
+    )
+    missing = [url for url in urls if url not in names]
+
+    with ThreadPoolExecutor(max_workers=settings.AVATAR_DOWNLOAD_CONCURRENCY) as executor:
+        for url, content in zip(missing, executor.map(download_avatar, missing)):
+            if content:
+                names[url] = store_avatar(content)
+
+    updated = []
+
+    for prospect in prospects:
+        url = avatars[prospect.id]
+
+        if url in names:
+            prospect.linkedin_avatar = names[url]
+            prospect.linkedin_avatar_source_url = url
+            # bulk_update skips auto_now
+            prospect.updated_at = timezone.now()
+            updated.append(prospect)
+
+    Prospect.objects.bulk_update(updated, ["linkedin_avatar", "linkedin_avatar_source_url", "updated_at"])
+
+    return len(updated)
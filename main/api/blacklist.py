@@ -0,0 +1,52 @@
+from functools import lru_cache
+import re
+
+
+PROSPECT_FIELDS = (
+    "first_name", "last_name", "name", "headline", "occupation", "current_company", "school_university", "bio",
+    "location", "email", "phone", "linkedin_profile_url", "linkedin_sales_navigator_profile_url",
+)
+
+# can't be typed in a blacklist word, so no match spans two fields
+FIELD_SEPARATOR = "\n"
+
+
+def get_blacklist_words(blacklist):
+    words = {word.strip().lower() for word in (blacklist or "").split(",")}
+    words.discard("")
+
+    return words
+
+
+@lru_cache(maxsize=1024)
+def get_blacklist_matcher(blacklist):
+    ''' One pattern for all the words of a blacklist, None when there are none. Keyed by the blacklist itself, so an
+        account gets a new matcher as soon as its blacklist is edited. '''
+
+    words = get_blacklist_words(blacklist)
+
+    if not words:
+        return None
+
+    return re.compile("|".join(re.escape(word) for word in sorted(words, key=len, reverse=True)))
+
+
+def get_prospect_text(prospect):
+    return FIELD_SEPARATOR.join((getattr(prospect, field, None) or "").lower() for field in PROSPECT_FIELDS)
+
+
+def is_blacklisted(linkedin_account, prospect):
+    matcher = get_blacklist_matcher(linkedin_account.blacklist)
+
+    return matcher is not None and matcher.search(get_prospect_text(prospect)) is not None
+
+
+def filter_blacklisted(linkedin_account, prospects):
+    ''' Prospects of a page that pass the blacklist, they don't need to be saved to be checked '''
+
+    matcher = get_blacklist_matcher(linkedin_account.blacklist)
+
+    if matcher is None:
+        return list(prospects)
+
+    return [prospect for prospect in prospects if matcher.search(get_prospect_text(prospect)) is None]
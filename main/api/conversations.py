@@ -0,0 +1,157 @@
+from hashlib import sha256
+from threading import Lock
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from redis.exceptions import RedisError
+from main.models import Message, Room
+from base.utils import get_redis
+
+
+# markers of inbox threads without a room, none of the account's prospects is in them
+_memory_markers = {}
+_memory_lock = Lock()
+
+
+def get_message_key(message_from, time, message, occurrence=0):
+    ''' Stable key of a message within its room. occurrence tells apart the same text sent twice at the same time. '''
+
+    return sha256(f"{message_from}\x00{time}\x00{message}\x00{occurrence}".encode()).hexdigest()
+
+
+def get_conversation_keys(conversation):
+    ''' Keys of the messages of a thread, in order. A source with ids of its own passes them in "key", the others
+        are keyed on what they show. '''
+
+    occurrences = {}
+    keys = []
+
+    for message in conversation:
+        value = (message["message_from"], message["time"], message["message"])
+        occurrences[value] = occurrences.get(value, -1) + 1
+        keys.append(message.get("key") or get_message_key(*value, occurrences[value]))
+
+    return keys
+
+
+def save_conversation(room, conversation, full=True):
+    ''' Adds the messages of the thread the room doesn't have yet, existing ones keep their ids. A full conversation
+        is the whole thread as far as its source shows it. Its messages that match no key then take over the room's
+        unmatched messages with the same sender and text, in order, whichever source stored them. Otherwise only
+        messages sent from the app, which have no key yet, are taken over. The counters of the room are moved along
+        in the same transaction. '''
+
+    keys = get_conversation_keys(conversation)
+    known = set(room.messages.filter(key__in=keys).values_list("key", flat=True))
+
+    if full:
+        candidates = room.messages.exclude(key__in=keys)
+    else:
+        candidates = room.messages.filter(key__isnull=True, message_from="User")
+
+    unmatched = {}
+
+    for message in candidates.order_by("id").only("id", "message_from", "message", "key"):
+        unmatched.setdefault((message.message_from, message.message), []).append(message)
+
+    new_messages = []
+
+    for key, message in zip(keys, conversation):
+        if key in known:
+            continue
+
+        known.add(key)
+        existing = unmatched.get((message["message_from"], message["message"]))
+
+        if existing:
+            taken_over = existing.pop(0)
+
+            if taken_over.key is None:
+                Message.objects.filter(id=taken_over.id).update(key=key, time=message["time"])
+
+            continue
+
+        new_messages.append(Message(
+            room=room,
+            message_from=message["message_from"],
+            time=message["time"],
+            message=message["message"],
+            key=key,
+        ))
+
+    received = sum(message.message_from == "Prospect" for message in new_messages)
+
+    with transaction.atomic():
+        Message.objects.bulk_create(new_messages, ignore_conflicts=True)
+
+        if new_messages:
+            Room.objects.filter(id=room.id).update(
+                prospect_message_count=F("prospect_message_count") + received,
+                unread_count=F("unread_count") + received,
+                last_message_at=timezone.now(),
+            )
+
+    return len(new_messages)
+
+
+def get_thread_marker(text):
+    ''' Fingerprint of a thread in the inbox list: who, the last message snippet and its time as displayed '''
+
+    return sha256(text.encode()).hexdigest()
+
+
+def get_markers_key(linkedin_account_id, platform):
+    return f"inbox_markers:{linkedin_account_id}:{platform}"
+
+
+def get_seen_markers(linkedin_account_id, platform, links):
+    if not links:
+        return {}
+
+    key = get_markers_key(linkedin_account_id, platform)
+    redis = get_redis()
+
+    if redis is not None:
+        try:
+            return {link: marker.decode() for link, marker in zip(links, redis.hmget(key, links)) if marker}
+        except RedisError as e:
+            print(f"Inbox markers fall back to memory: {e}")
+
+    with _memory_lock:
+        markers = _memory_markers.get(key, {})
+        return {link: markers[link] for link in links if link in markers}
+
+
+def set_seen_marker(linkedin_account_id, platform, link, marker):
+    key = get_markers_key(linkedin_account_id, platform)
+    redis = get_redis()
+
+    if redis is not None:
+        try:
+            redis.hset(key, link, marker)
+            return
+        except RedisError as e:
+            print(f"Inbox markers fall back to memory: {e}")
+
+    with _memory_lock:
+        _memory_markers.setdefault(key, {})[link] = marker
+
+
+def get_changed_threads(linkedin_account, platform, threads):
+    ''' Links of the {link: marker} threads listed in the inbox that changed since they were last opened '''
+
+    seen = dict(Room.objects.filter(
+        linkedin_account=linkedin_account, platform=platform, message_thread__in=threads
+    ).values_list("message_thread", "last_seen_marker"))
+    seen.update(get_seen_markers(linkedin_account.id, platform, [link for link in threads if link not in seen]))
+
+    return [link for link, marker in threads.items() if seen.get(link) != marker]
+
+
+def mark_thread_seen(linkedin_account, platform, link, marker):
+    ''' The thread was opened, it is skipped until its marker in the list changes again '''
+
+    if not Room.objects.filter(linkedin_account=linkedin_account, platform=platform, message_thread=link).update(
+        last_seen_marker=marker
+    ):
+        set_seen_marker(linkedin_account.id, platform, link, marker)
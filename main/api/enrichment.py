@@ -0,0 +1,257 @@
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from threading import BoundedSemaphore, Lock
+from time import monotonic, sleep
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from main.models import ProfileSnapshot
+from base.voyager import VOYAGER_API, get_voyager_client
+
+
+SNAPSHOT_FIELDS = ("first_name", "last_name", "headline", "location", "profile_image", "school", "company", "profile_urn", "bio", "occupation")
+
+_budgets = {}
+_registry_lock = Lock()
+
+
+@dataclass
+class ProfileRecord:
+    first_name: str
+    last_name: str
+    headline: str
+    location: str
+    profile_image: str
+    email: str
+    school: str
+    company: str
+    profile_urn: str
+    bio: str
+    occupation: str
+
+    @property
+    def name(self):
+        return f"{self.first_name} {self.last_name}"
+
+    @property
+    def entity_urn(self):
+        return self.profile_urn.split("fsd_profile:")[-1]
+
+    @classmethod
+    def from_snapshot(cls, snapshot, contact_info):
+        ''' Contact info depends on who is looking, so it is never shared through the snapshots and is fetched for
+            each prospect '''
+
+        return cls(email=contact_info.get("emailAddress", ""), **{field: getattr(snapshot, field) for field in SNAPSHOT_FIELDS})
+
+    def apply(self, prospect):
+        ''' Copies the crawled details on the prospect, the avatar is left to fetch_prospect_avatars and the email to get_email '''
+
+        prospect.first_name = self.first_name
+        prospect.last_name = self.last_name
+        prospect.name = self.name
+        prospect.bio = self.bio
+        prospect.occupation = self.occupation
+        prospect.current_company = self.company
+        prospect.school_university = self.school
+        prospect.headline = self.headline
+        prospect.location = self.location
+        prospect.fully_crawled = True
+        prospect.entity_urn = self.entity_urn
+
+
+class AccountBudget:
+    ''' Caps the requests in flight for a linkedin account and keeps a minimum gap between their starts '''
+
+    def __init__(self, concurrency, interval):
+        self.semaphore = BoundedSemaphore(concurrency)
+        self.lock = Lock()
+        self.interval = interval
+        self.next_request_at = 0
+
+    def __enter__(self):
+        self.semaphore.acquire()
+
+        with self.lock:
+            now = monotonic()
+            wait = max(0, self.next_request_at - now)
+            self.next_request_at = max(now, self.next_request_at) + self.interval
+
+        if wait:
+            sleep(wait)
+
+        return self
+
+    def __exit__(self, *args):
+        self.semaphore.release()
+
+
+def get_account_budget(linkedin_account_id):
+
+    with _registry_lock:
+        if linkedin_account_id not in _budgets:
+            _budgets[linkedin_account_id] = AccountBudget(
+                settings.ENRICHMENT_CONCURRENCY_PER_ACCOUNT, settings.ENRICHMENT_MIN_REQUEST_INTERVAL
+            )
+
+        return _budgets[linkedin_account_id]
+
+
+def get_json(client, budget, url):
+
+    with budget:
+        return client.get_json(url)
+
+
+def get_profile_urls(profile_id):
+    return {
+        "essential_details": f"{VOYAGER_API}/identity/dash/profiles?q=memberIdentity&memberIdentity={profile_id}&decorationId=com.linkedin.voyager.dash.deco.identity.profile.WebTopCardCore-8",
+        "contact_info": f"{VOYAGER_API}/identity/profiles/{profile_id}/profileContactInfo",
+        "top_card": f"{VOYAGER_API}/identity/dash/profiles?q=memberIdentity&memberIdentity={profile_id}&decorationId=com.linkedin.voyager.dash.deco.identity.profile.TopCardSupplementary-106",
+    }
+
+
+def get_profile_cards_url(profile_urn):
+    return f"{VOYAGER_API}/graphql?includeWebMetadata=true&variables=(profileUrn:{urllib.parse.quote_plus(profile_urn)})&&queryId=voyagerIdentityDashProfileCards.817fd31c31e97c7c17c9cd5d44c6edea"
+
+
+def parse_essential_details(essential_details_json):
+    profile = essential_details_json["elements"][0]
+
+    try:
+        profile_image_root = profile["profilePicture"]["displayImageReference"]["vectorImage"]["rootUrl"]
+        profile_image_200 = profile["profilePicture"]["displayImageReference"]["vectorImage"]["artifacts"][1]["fileIdentifyingUrlPathSegment"]
+        profile_image = f"{profile_image_root}{profile_image_200}"
+    except KeyError:
+        profile_image = ""
+
+    try:
+        location = profile["geoLocation"]["geo"]["defaultLocalizedName"]
+    except KeyError:
+        location = ""
+
+    return {
+        "first_name": profile["firstName"],
+        "last_name": profile["lastName"],
+        "headline": profile.get("headline", ""),
+        "location": location,
+        "profile_image": profile_image,
+    }
+
+
+def parse_top_card(top_card_json):
+    profile = top_card_json["elements"][0]
+
+    school = [elem.get("school", {}).get("name", "") or elem.get("schoolName", "") for elem in profile["profileTopEducation"]["elements"]] or [""]
+    company = [elem.get("company", {}).get("name", "") or elem.get("companyName", "") for elem in profile["profileTopPosition"]["elements"]] or [""]
+
+    return {
+        "school": school[0],
+        "company": company[0],
+        "profile_urn": profile["entityUrn"],
+    }
+
+
+def parse_profile_cards(profile_cards_json):
+    cards = profile_cards_json["data"]["identityDashProfileCardsByInitialCards"]["elements"]
+
+    bio = [elem["topComponents"][1]["components"]["textComponent"]["text"]["text"] for elem in cards if "ABOUT" in elem["entityUrn"] and elem["topComponents"]] or [""]
+    occupation = [elem["topComponents"][1]["components"]["fixedListComponent"]["components"][0]["components"]["entityComponent"]["title"]["text"] for elem in cards if "EXPERIENCE" in elem["entityUrn"] and elem["topComponents"]] or [""]
+
+    return {
+        "bio": bio[0],
+        "occupation": occupation[0].split(" at ")[0],
+    }
+
+
+def build_profile_record(client, budget, responses):
+    ''' The profile cards call needs the urn from the top card, so it is the only one made after the others '''
+
+    top_card = parse_top_card(responses["top_card"])
+
+    return ProfileRecord(
+        email=responses["contact_info"].get("emailAddress", ""),
+        **parse_essential_details(responses["essential_details"]),
+        **top_card,
+        **parse_profile_cards(get_json(client, budget, get_profile_cards_url(top_card["profile_urn"]))),
+    )
+
+
+def get_profile_snapshots(prospects):
+    ''' {profile id or entity urn: ProfileSnapshot} of the prospects, only the ones younger than the TTL '''
+
+    profile_ids = [prospect.profile_id for prospect in prospects if prospect.profile_id]
+    entity_urns = [prospect.entity_urn for prospect in prospects if prospect.entity_urn]
+    snapshots = {}
+
+    for snapshot in ProfileSnapshot.objects.filter(
+        Q(profile_id__in=profile_ids) | Q(entity_urn__in=entity_urns),
+        updated_at__gte=timezone.now() - timedelta(days=settings.PROFILE_SNAPSHOT_TTL_DAYS),
+    ):
+        snapshots[snapshot.profile_id] = snapshots[snapshot.entity_urn] = snapshot
+
+    return snapshots
+
+
+def get_profile_snapshot(snapshots, prospect):
+    return snapshots.get(prospect.profile_id) or prospect.entity_urn and snapshots.get(prospect.entity_urn)
+
+
+def save_profile_snapshot(profile_id, profile_record):
+    values = asdict(profile_record)
+
+    ProfileSnapshot.objects.update_or_create(profile_id=profile_id, defaults={
+        "entity_urn": profile_record.entity_urn,
+        **{field: values[field] or "" for field in SNAPSHOT_FIELDS},
+    })
+
+
+def iter_profile_records(prospects, linkedin_account):
+    ''' Yields (prospect, ProfileRecord) in order. A fresh snapshot leaves only the contact info call to make, for
+        the others the independent calls of a prospect run at the same time. The next prospects are fetched while the
+        caller is busy with the current one, all within the account budget. '''
+
+    client = get_voyager_client(linkedin_account)
+    budget = get_account_budget(linkedin_account.id)
+    prospects = list(prospects)
+    snapshots = get_profile_snapshots(prospects)
+    prospects = iter(prospects)
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=settings.ENRICHMENT_CONCURRENCY_PER_ACCOUNT) as executor:
+
+        def submit_next():
+            prospect = next(prospects, None)
+
+            if prospect is None:
+                return
+
+            snapshot = get_profile_snapshot(snapshots, prospect)
+            urls = get_profile_urls(prospect.profile_id or snapshot and snapshot.profile_id)
+
+            if snapshot:
+                urls = {"contact_info": urls["contact_info"]}
+
+            pending.append((prospect, snapshot, {
+                name: executor.submit(get_json, client, budget, url) for name, url in urls.items()
+            }))
+
+        for _ in range(settings.ENRICHMENT_PREFETCH_PROSPECTS + 1):
+            submit_next()
+
+        while pending:
+            prospect, snapshot, futures = pending.popleft()
+            submit_next()
+            responses = {name: future.result() for name, future in futures.items()}
+
+            if snapshot:
+                yield prospect, ProfileRecord.from_snapshot(snapshot, responses["contact_info"])
+                continue
+
+            profile_record = build_profile_record(client, budget, responses)
+            save_profile_snapshot(prospect.profile_id, profile_record)
+
+            yield prospect, profile_record
@@ -0,0 +1,139 @@
+from threading import Event, Lock, Thread
+from time import monotonic
+from uuid import uuid4
+from django.conf import settings
+from redis.exceptions import RedisError
+from base.utils import get_redis
+
+
+# keys[1] lock, argv[1] token
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+
+return 0
+"""
+
+# keys[1] lock, argv[1] token, argv[2] ttl
+EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+
+return 0
+"""
+
+_memory_locks = {}
+_memory_lock = Lock()
+
+
+def get_lock_key(name):
+    return f"lock:{name}"
+
+
+def acquire_lock(name, ttl):
+    ''' Token of the lock when it was free, None when someone else holds it. It expires after ttl seconds in case
+        the holder dies without releasing it. '''
+
+    key = get_lock_key(name)
+    token = uuid4().hex
+    redis = get_redis()
+
+    if redis is not None:
+        try:
+            return token if redis.set(key, token, nx=True, ex=ttl) else None
+        except RedisError as e:
+            print(f"Locks fall back to memory: {e}")
+
+    with _memory_lock:
+        holder = _memory_locks.get(key)
+
+        if holder is not None and holder[1] > monotonic():
+            return None
+
+        _memory_locks[key] = (token, monotonic() + ttl)
+
+    return token
+
+
+def release_lock(name, token):
+    ''' Only the holder of the token releases the lock, an expired one may already belong to someone else '''
+
+    key = get_lock_key(name)
+    redis = get_redis()
+
+    if redis is not None:
+        try:
+            return bool(redis.eval(RELEASE_SCRIPT, 1, key, token))
+        except RedisError as e:
+            print(f"Locks fall back to memory: {e}")
+
+    with _memory_lock:
+        holder = _memory_locks.get(key)
+
+        if holder is None or holder[0] != token:
+            return False
+
+        del _memory_locks[key]
+
+    return True
+
+
+def extend_lock(name, token, ttl):
+    ''' Pushes the expiry of a held lock ttl seconds ahead, False when the lock expired or was taken over '''
+
+    key = get_lock_key(name)
+    redis = get_redis()
+
+    if redis is not None:
+        try:
+            return bool(redis.eval(EXTEND_SCRIPT, 1, key, token, ttl))
+        except RedisError as e:
+            print(f"Locks fall back to memory: {e}")
+
+    with _memory_lock:
+        holder = _memory_locks.get(key)
+
+        if holder is None or holder[0] != token or holder[1] <= monotonic():
+            return False
+
+        _memory_locks[key] = (token, monotonic() + ttl)
+
+    return True
+
+
+def get_lock_name(linkedin_account_id, action):
+    return f"linkedin_account:{linkedin_account_id}:{action}"
+
+
+class Lease:
+    ''' Non blocking lock kept alive by a heartbeat thread while the holder runs. A worker that dies stops the
+        heartbeat, so its lease expires after ttl seconds without anyone having to clean up after it. '''
+
+    def __init__(self, name, ttl=None):
+        self.name = name
+        self.ttl = ttl or settings.LOCK_LEASE_TTL
+        self.token = None
+        self.stopped = Event()
+
+    def heartbeat(self):
+
+        while not self.stopped.wait(self.ttl / 3):
+            if not extend_lock(self.name, self.token, self.ttl):
+                print(f"Lease {self.name} was lost")
+                return
+
+    def __enter__(self):
+        self.token = acquire_lock(self.name, self.ttl)
+
+        if self.token is not None:
+            Thread(target=self.heartbeat, daemon=True).start()
+
+        return self
+
+    def __exit__(self, *args):
+
+        if self.token is not None:
+            self.stopped.set()
+            release_lock(self.name, self.token)
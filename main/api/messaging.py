@@ -0,0 +1,264 @@
+from datetime import datetime, timezone as dt_timezone
+from hashlib import sha256
+from django.conf import settings
+from django.db.models import Q
+import requests
+from accounts.models import LinkedinAccount
+from main.models import Prospect, Room
+from base.voyager import VOYAGER_API, get_voyager_client
+from .conversations import save_conversation
+
+
+MESSAGING_MEMBER = "com.linkedin.voyager.messaging.MessagingMember"
+MESSAGE_EVENT = "com.linkedin.voyager.messaging.event.MessageEvent"
+
+
+def get_elements(client, url):
+    ''' Raises on anything but a 200, the caller falls back to the browser '''
+
+    response = client.get(url)
+
+    if response.status_code != requests.codes.ok:
+        raise requests.HTTPError(f"{response.status_code} from {url}", response=response)
+
+    return response.json().get("elements", [])
+
+
+def get_conversation_id(conversation):
+    return conversation["entityUrn"].split(":")[-1]
+
+
+def get_thread_url(conversation_id):
+    # same link the messaging page has, so rooms are shared with the browser sync
+    return f"https://www.linkedin.com/messaging/thread/{conversation_id}/"
+
+
+def get_member_ids(member):
+    ''' (public identifier, profile id) of a participant or sender '''
+
+    mini_profile = (member or {}).get(MESSAGING_MEMBER, {}).get("miniProfile", {})
+
+    return mini_profile.get("publicIdentifier"), mini_profile.get("entityUrn", "").split(":")[-1]
+
+
+def get_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp / 1000, dt_timezone.utc)
+
+
+def get_event_key(event):
+    ''' Message key from the id of the event, it doesn't change with how the time is displayed '''
+
+    if not event.get("entityUrn"):
+        return None
+
+    return sha256(event["entityUrn"].encode()).hexdigest()
+
+
+def get_event_text(event):
+    content = event.get("eventContent", {}).get(MESSAGE_EVENT)
+
+    if content is None:
+        return None
+
+    return (content.get("attributedBody") or {}).get("text") or content.get("body") or ""
+
+
+def iter_conversation_pages(client, created_before=None):
+    ''' Pages of the inbox, most recently active conversations first, paged with createdBefore '''
+
+    while True:
+        url = f"{VOYAGER_API}/messaging/conversations?keyVersion=LEGACY_INBOX"
+
+        if created_before:
+            url += f"&createdBefore={created_before}"
+
+        conversations = get_elements(client, url)
+
+        if not conversations:
+            return
+
+        yield conversations
+
+        oldest = min(conversation["lastActivityAt"] for conversation in conversations)
+
+        if created_before and oldest >= created_before:
+            return
+
+        created_before = oldest
+
+
+def get_new_events(client, conversation_id, cursor):
+    ''' Message events of the conversation created after the cursor, oldest first '''
+
+    events = {}
+    created_before = None
+
+    while True:
+        url = f"{VOYAGER_API}/messaging/conversations/{conversation_id}/events"
+
+        if created_before:
+            url += f"?createdBefore={created_before}"
+
+        page = get_elements(client, url)
+
+        for event in page:
+            if not cursor or event["createdAt"] > cursor:
+                events[event.get("entityUrn") or event["createdAt"]] = event
+
+        oldest = min((event["createdAt"] for event in page), default=None)
+
+        if oldest is None or cursor and oldest <= cursor or created_before and oldest >= created_before:
+            break
+
+        created_before = oldest
+
+    return sorted(events.values(), key=lambda event: event["createdAt"])
+
+
+def get_participant_keys(participant):
+    public_identifier, profile_id = participant
+    keys = []
+
+    if public_identifier:
+        keys.append(f"https://www.linkedin.com/in/{public_identifier}/")
+
+    if profile_id:
+        keys += [f"https://www.linkedin.com/in/{profile_id}/", profile_id]
+
+    return keys
+
+
+def get_conversation_prospect(linkedin_account, participants):
+    ''' (participant, prospect) of the conversation, matched by profile url or urn. (None, None) when none of the
+        participants is a prospect of the account. '''
+
+    participants = {key: participant for participant in participants for key in get_participant_keys(participant)}
+    prospect = Prospect.objects.filter(
+        Q(linkedin_profile_url__in=participants) | Q(entity_urn__in=participants),
+        campaign_linkedin_account__linkedin_account=linkedin_account,
+    ).order_by("id").last()
+
+    if prospect is None:
+        return None, None
+
+    return participants.get(prospect.linkedin_profile_url) or participants.get(prospect.entity_urn), prospect
+
+
+def sync_conversation(client, room, participant):
+    events = get_new_events(client, room.message_thread.rstrip("/").split("/")[-1], room.messages_cursor)
+    conversation = []
+
+    for event in events:
+        text = get_event_text(event)
+
+        if text is None:
+            continue
+
+        conversation.append({
+            "message_from": "Prospect" if get_member_ids(event.get("from")) == participant else "User",
+            "time": get_datetime(event["createdAt"]).isoformat(),
+            "message": text,
+            "key": get_event_key(event),
+        })
+
+    # without a cursor the whole thread was fetched, messages the browser stored for it are taken over
+    created = save_conversation(room, conversation, full=room.messages_cursor is None)
+
+    if events:
+        Room.objects.filter(id=room.id).update(messages_cursor=events[-1]["createdAt"])
+
+    return created
+
+
+def sync_inbox_conversation(client, linkedin_account, conversation, last_activity_at):
+    participant, prospect = get_conversation_prospect(
+        linkedin_account, [get_member_ids(participant) for participant in conversation.get("participants", [])])
+
+    if prospect is None:
+        return 0
+
+    room, _ = Room.objects.get_or_create(
+        linkedin_account=linkedin_account,
+        message_thread=get_thread_url(get_conversation_id(conversation)),
+        platform="Linkedin",
+    )
+
+    if room.last_activity_at and room.last_activity_at >= last_activity_at:
+        return 0
+
+    if room.prospect_id != prospect.id:
+        room.prospect = prospect
+        room.save()
+
+    created = sync_conversation(client, room, participant)
+    Room.objects.filter(id=room.id).update(last_activity_at=last_activity_at)
+
+    return created
+
+
+def sync_inbox_pages(client, linkedin_account, created_before, synced_until):
+    ''' One pass over the inbox, from created_before (the top when None) down to synced_until (the end of the inbox
+        when None), of at most MESSAGING_SYNC_MAX_PAGES pages. Returns the number of new messages, the newest
+        activity read and the createdBefore to resume from, None when the pass got all the way. '''
+
+    newest = None
+    created = 0
+
+    for number, page in enumerate(iter_conversation_pages(client, created_before), 1):
+        for conversation in page:
+            last_activity_at = get_datetime(conversation["lastActivityAt"])
+            newest = max(newest or last_activity_at, last_activity_at)
+
+            if synced_until and last_activity_at <= synced_until:
+                return created, newest, None
+
+            created += sync_inbox_conversation(client, linkedin_account, conversation, last_activity_at)
+
+        if number == settings.MESSAGING_SYNC_MAX_PAGES:
+            return created, newest, min(conversation["lastActivityAt"] for conversation in page)
+
+    return created, newest, None
+
+
+def update_linkedin_account(linkedin_account, **changes):
+    LinkedinAccount.objects.filter(id=linkedin_account.id).update(**changes)
+
+    for field, value in changes.items():
+        setattr(linkedin_account, field, value)
+
+
+def sync_linkedin_messaging(linkedin_account):
+    ''' Brings the linkedin inbox of the account up to date over the voyager api. Conversations are read from the top
+        until the ones the last sync started from, and only their new events are fetched. When a sync hits the page
+        cap first, the conversations it didn't get to are read back by the next syncs, from where it stopped.
+        Returns the number of new messages. '''
+
+    client = get_voyager_client(linkedin_account)
+    synced_until = linkedin_account.messages_synced_until
+    # an error raises before the account is updated, so nothing a pass didn't read is taken as synced
+    created, newest, resume_before = sync_inbox_pages(client, linkedin_account, None, synced_until)
+    changes = {}
+
+    if newest and (synced_until is None or newest > synced_until):
+        changes["messages_synced_until"] = newest
+
+    if resume_before is not None:
+        # joined with a backfill already pending, which is older, by reading down to its end
+        if linkedin_account.messages_backfill_before is None:
+            changes["messages_backfill_until"] = synced_until
+
+        changes["messages_backfill_before"] = resume_before
+
+    update_linkedin_account(linkedin_account, **changes)
+
+    if linkedin_account.messages_backfill_before is not None:
+        backfilled, _, resume_before = sync_inbox_pages(
+            client, linkedin_account, linkedin_account.messages_backfill_before, linkedin_account.messages_backfill_until)
+        created += backfilled
+
+        if resume_before is None:
+            update_linkedin_account(linkedin_account, messages_backfill_before=None, messages_backfill_until=None)
+        else:
+            update_linkedin_account(linkedin_account, messages_backfill_before=resume_before)
+
+    return created
@@ -0,0 +1,193 @@
+from collections import defaultdict
+from django.db.models import Count, Q, OuterRef, Subquery
+from main.models import Campaign, CampaignLinkedinAccount, CampaignSequence, Prospect, ProspectLabel
+
+
+CONNECTED_PROSPECTS = Q(connection_request_sent=True, connected=True)
+FULLY_CRAWLED_PROSPECTS = Q(fully_crawled=True)
+EMAILED_PROSPECTS = Q(fully_crawled=True, email__isnull=False)
+
+# (counter, step, prospects that are counted for the step, multiplier)
+STEP_COUNTERS = (
+    ("message_sent", "send_message", "connected", 1),
+    ("inmail_sent", "send_inmail", "fully_crawled", 1),
+    ("email_sent", "send_email", "emailed", 1),
+    ("liked_posts", "like_3_posts", "fully_crawled", 3),
+    ("followed", "follow", "fully_crawled", 1),
+    ("endorsed", "endorse_top_5_skills", "fully_crawled", 5),
+)
+
+PROSPECT_COUNTERS = (
+    "total_prospects_crawled",
+    "total_prospects_fully_crawled",
+    "total_connection_request_sent",
+    "total_connection_request_accepted",
+    "total_prospects_lead",
+    "total_prospects_customer",
+)
+
+COUNTERS = PROSPECT_COUNTERS + tuple(counter for counter, step, audience, multiplier in STEP_COUNTERS)
+
+CONNECTED_PROSPECT_AVATARS = 4
+ASSIGNED_LINKEDIN_ACCOUNTS = 7
+
+
+def count_steps_done(sequence_steps, step, state_order, state_step, state_finished):
+    ''' Steps before the prospect's current state are done, the current one only once it has finished '''
+
+    done = len([order for order, sequence_step in sequence_steps if sequence_step == step and order < state_order])
+
+    if state_step == step and state_finished:
+        done += 1
+
+    return done
+
+
+def get_campaigns_sequence_steps(campaign_ids):
+    sequence_steps = defaultdict(list)
+
+    for campaign_id, order, step in CampaignSequence.objects.filter(campaign_id__in=campaign_ids).order_by("order").values_list("campaign_id", "order", "step"):
+        sequence_steps[campaign_id].append((order, step))
+
+    return sequence_steps
+
+
+def get_campaigns_counters(campaigns, sequence_steps=None):
+    ''' Dashboard counters of many campaigns with a fixed number of grouped queries '''
+
+    campaign_ids = [campaign.id for campaign in campaigns]
+    counters = {campaign_id: dict.fromkeys(COUNTERS, 0) for campaign_id in campaign_ids}
+
+    if not campaign_ids:
+        return counters
+
+    if sequence_steps is None:
+        sequence_steps = get_campaigns_sequence_steps(campaign_ids)
+
+    prospects = Prospect.objects.filter(campaign_linkedin_account__campaign_id__in=campaign_ids).order_by()
+
+    for row in prospects.values("campaign_linkedin_account__campaign_id").annotate(
+        crawled_count=Count("id"),
+        fully_crawled_count=Count("id", filter=FULLY_CRAWLED_PROSPECTS),
+        connection_request_sent_count=Count("id", filter=Q(connection_request_sent=True)),
+        connection_request_accepted_count=Count("id", filter=CONNECTED_PROSPECTS),
+    ):
+        campaign_counters = counters[row["campaign_linkedin_account__campaign_id"]]
+        campaign_counters["total_prospects_crawled"] = row["crawled_count"]
+        campaign_counters["total_prospects_fully_crawled"] = row["fully_crawled_count"]
+        campaign_counters["total_connection_request_sent"] = row["connection_request_sent_count"]
+        campaign_counters["total_connection_request_accepted"] = row["connection_request_accepted_count"]
+
+    for row in ProspectLabel.objects.filter(
+        prospect__campaign_linkedin_account__campaign_id__in=campaign_ids,
+        label__name__in=["Lead", "Customer"],
+    ).order_by().values("prospect__campaign_linkedin_account__campaign_id").annotate(
+        lead_count=Count("id", filter=Q(label__name="Lead")),
+        customer_count=Count("id", filter=Q(label__name="Customer")),
+    ):
+        campaign_counters = counters[row["prospect__campaign_linkedin_account__campaign_id"]]
+        campaign_counters["total_prospects_lead"] = row["lead_count"]
+        campaign_counters["total_prospects_customer"] = row["customer_count"]
+
+    finished = Q(state_status="Finished")
+    audiences = {
+        "connected": CONNECTED_PROSPECTS,
+        "fully_crawled": FULLY_CRAWLED_PROSPECTS,
+        "emailed": EMAILED_PROSPECTS,
+    }
+    annotations = {}
+
+    for audience, audience_filter in audiences.items():
+        annotations[f"{audience}_count"] = Count("id", filter=audience_filter)
+        annotations[f"{audience}_finished_count"] = Count("id", filter=audience_filter & finished)
+
+    # one row per (campaign, current step) instead of one row per prospect
+    for row in prospects.filter(state__isnull=False).values(
+        "campaign_linkedin_account__campaign_id", "state__order", "state__step",
+    ).annotate(**annotations):
+        campaign_id = row["campaign_linkedin_account__campaign_id"]
+        campaign_counters = counters[campaign_id]
+
+        for counter, step, audience, multiplier in STEP_COUNTERS:
+            before = count_steps_done(sequence_steps[campaign_id], step, row["state__order"], None, False)
+            campaign_counters[counter] += before * row[f"{audience}_count"] * multiplier
+
+            if row["state__step"] == step:
+                campaign_counters[counter] += row[f"{audience}_finished_count"] * multiplier
+
+    return counters
+
+
+def get_campaigns_connected_prospect_avatars(campaign_ids):
+    connected_prospects = Prospect.objects.filter(
+        campaign_linkedin_account__campaign=OuterRef("pk"),
+        fully_crawled=True,
+        connected=True,
+        linkedin_avatar__isnull=False,
+    ).exclude(linkedin_avatar__exact="").order_by("id").values("id")
+
+    # the first few avatar ids of every campaign are picked by the database
+    avatar_slots = {
+        f"avatar_{index}": Subquery(connected_prospects[index:index + 1])
+        for index in range(CONNECTED_PROSPECT_AVATARS)
+    }
+    campaign_avatar_ids = {
+        row["id"]: [row[slot] for slot in avatar_slots if row[slot]]
+        for row in Campaign.objects.filter(id__in=campaign_ids).annotate(**avatar_slots).values("id", *avatar_slots)
+    }
+
+    prospects = Prospect.objects.only("id", "name", "linkedin_avatar").in_bulk(
+        [prospect_id for ids in campaign_avatar_ids.values() for prospect_id in ids]
+    )
+
+    return {
+        campaign_id: [{"avatar": prospects[prospect_id].linkedin_avatar.url, "name": prospects[prospect_id].name} for prospect_id in ids]
+        for campaign_id, ids in campaign_avatar_ids.items()
+    }
+
+
+def get_campaigns_assigned_linkedin_accounts(campaign_ids):
+    assigned = defaultdict(list)
+
+    for row in CampaignLinkedinAccount.objects.filter(
+        campaign_id__in=campaign_ids, linkedin_account__avatar__isnull=False
+    ).distinct().values("campaign_id", "linkedin_account__name", "linkedin_account__avatar"):
+
+        campaign_id = row.pop("campaign_id")
+
+        if len(assigned[campaign_id]) < ASSIGNED_LINKEDIN_ACCOUNTS:
+            assigned[campaign_id].append(row)
+
+    return assigned
+
+
+def get_progress(campaign, total_prospects_fully_crawled):
+
+    if not campaign.crawl_total_prospects:
+        return 0
+
+    return int((total_prospects_fully_crawled / campaign.crawl_total_prospects) * 100)
+
+
+def get_campaigns_metrics(campaigns, counters=None):
+    ''' Everything CampaignSerializer shows for a page of campaigns, the query count doesn't grow with the page '''
+
+    campaign_ids = [campaign.id for campaign in campaigns]
+    sequence_steps = get_campaigns_sequence_steps(campaign_ids)
+
+    if counters is None:
+        counters = get_campaigns_counters(campaigns, sequence_steps)
+
+    avatars = get_campaigns_connected_prospect_avatars(campaign_ids) if campaign_ids else {}
+    assigned = get_campaigns_assigned_linkedin_accounts(campaign_ids) if campaign_ids else {}
+    metrics = {}
+
+    for campaign in campaigns:
+        campaign_metrics = dict(counters[campaign.id])
+        campaign_metrics["total_steps_count"] = len(sequence_steps[campaign.id])
+        campaign_metrics["progress"] = get_progress(campaign, campaign_metrics["total_prospects_fully_crawled"])
+        campaign_metrics["connected_prospect_avatars"] = avatars.get(campaign.id, [])
+        campaign_metrics["assigned"] = assigned.get(campaign.id, [])
+        metrics[campaign.id] = campaign_metrics
+
+    return metrics
@@ -0,0 +1,69 @@
+from random import uniform
+from threading import Lock
+from time import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from celery import current_app
+from redis.exceptions import RedisError
+from base.utils import get_redis
+
+
+# keys[1] last slot of the account, argv: now, gap, horizon
+NEXT_SLOT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local slot = math.max(now, tonumber(redis.call('GET', KEYS[1]) or 0) + tonumber(ARGV[2]))
+
+if slot - now > tonumber(ARGV[3]) then
+    return false
+end
+
+redis.call('SET', KEYS[1], tostring(slot), 'EX', math.ceil(slot - now + tonumber(ARGV[2])))
+
+return tostring(slot)
+"""
+
+_memory_slots = {}
+_memory_lock = Lock()
+
+
+def get_slot_key(linkedin_account_id):
+    return f"pacing:{linkedin_account_id}"
+
+
+def get_next_slot(linkedin_account_id):
+    ''' Not-before time of the account's next action, a random gap after its previous one. None when that is further
+        away than PACING_HORIZON, the next run of perform_campaign_actions schedules it instead. '''
+
+    key = get_slot_key(linkedin_account_id)
+    gap = uniform(settings.PACING_MIN_GAP, settings.PACING_MAX_GAP)
+    now = time()
+    redis = get_redis()
+
+    if redis is not None:
+        try:
+            slot = redis.eval(NEXT_SLOT_SCRIPT, 1, key, now, gap, settings.PACING_HORIZON)
+            return datetime.fromtimestamp(float(slot), dt_timezone.utc) if slot else None
+        except RedisError as e:
+            print(f"Pacing falls back to memory: {e}")
+
+    with _memory_lock:
+        slot = max(now, _memory_slots.get(key, 0) + gap)
+
+        if slot - now > settings.PACING_HORIZON:
+            return None
+
+        _memory_slots[key] = slot
+
+    return datetime.fromtimestamp(slot, dt_timezone.utc)
+
+
+def schedule_prospect_step(prospect, campaign_sequence, eta):
+    ''' Marks the prospect as performing the step, so later runs don't pick it up again, and queues the step for eta '''
+
+    prospect.state = campaign_sequence
+    prospect.state_status = "Performing"
+    prospect.state_action_start_time = eta
+    prospect.save(update_fields=["state", "state_status", "state_action_start_time"])
+
+    # by name, the task module imports the step loops
+    current_app.send_task("perform_prospect_step", args=[prospect.id, campaign_sequence.id], eta=eta)
@@ -0,0 +1,149 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+
+
+def get_ordering_fields(model, ordering):
+    return [(model._meta.get_field(field.lstrip("-")), field.startswith("-")) for field in ordering]
+
+
+def get_keyset_filter(model, ordering, position):
+    ''' Rows strictly after position, e.g. for ("-updated_at", "id"): updated_at < a or (updated_at = a and id > b) '''
+
+    keyset_filter = Q()
+    equal = Q()
+
+    for (field, descending), value in zip(get_ordering_fields(model, ordering), position):
+        lookup = "lt" if descending else "gt"
+        keyset_filter |= equal & Q(**{f"{field.attname}__{lookup}": value})
+        equal &= Q(**{field.attname: value})
+
+    return keyset_filter
+
+
+def get_position(model, ordering, instance):
+    return [field.value_to_string(instance) for field, descending in get_ordering_fields(model, ordering)]
+
+
+def encode_cursor(position):
+    return b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(model, ordering, cursor):
+
+    try:
+        position = json.loads(b64decode(cursor.encode()).decode())
+        fields = get_ordering_fields(model, ordering)
+
+        if len(position) != len(fields):
+            raise ValueError
+
+        return [field.to_python(value) for (field, descending), value in zip(fields, position)]
+
+    except Exception:
+        raise NotFound("Invalid cursor")
+
+
+def get_keyset_page(queryset, ordering, page_size, position=None):
+    ''' One page after position and the position of the next page, None when it is the last one '''
+
+    queryset = queryset.order_by(*ordering)
+
+    if position is not None:
+        queryset = queryset.filter(get_keyset_filter(queryset.model, ordering, position))
+
+    results = list(queryset[:page_size + 1])
+
+    if len(results) <= page_size:
+        return results, None
+
+    results = results[:page_size]
+
+    return results, get_position(queryset.model, ordering, results[-1])
+
+
+class KeysetPagination(BasePagination):
+    ''' Cursor pagination on a unique composite ordering, the view sets it with keyset_ordering '''
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 100
+    max_page_size = 1000
+    ordering = ("-created_at", "-id")
+
+    def get_page_size(self, request):
+
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = getattr(view, "keyset_ordering", self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        position = decode_cursor(queryset.model, ordering, cursor) if cursor else None
+
+        results, self.next_position = get_keyset_page(queryset, ordering, self.get_page_size(request), position)
+
+        return results
+
+    def get_next_link(self):
+
+        if self.next_position is None:
+            return None
+
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+
+class NDJSONStreamMixin:
+    ''' ?stream=ndjson streams every row of the list one JSON object per line, walking it in keyset pages '''
+
+    stream_query_param = "stream"
+    stream_page_size = 500
+
+    def list(self, request, *args, **kwargs):
+
+        if request.query_params.get(self.stream_query_param) != "ndjson":
+            return super(NDJSONStreamMixin, self).list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+
+        return StreamingHttpResponse(self.stream_ndjson(queryset), content_type="application/x-ndjson")
+
+    def stream_ndjson(self, queryset):
+        ordering = getattr(self, "keyset_ordering", KeysetPagination.ordering)
+        position = None
+
+        while True:
+            results, position = get_keyset_page(queryset, ordering, self.stream_page_size, position)
+
+            for row in self.get_serializer(results, many=True).data:
+                yield json.dumps(row, cls=JSONEncoder) + "\n"
+
+            if position is None:
+                break
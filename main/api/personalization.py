@@ -0,0 +1,80 @@
+from functools import lru_cache
+import re
+
+
+# placeholder: attribute it is filled with
+PROSPECT_VARIABLES = {
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "full_name": "name",
+    "headline": "headline",
+    "occupation": "occupation",
+    "company_name": "current_company",
+    "college_name": "school_university",
+    "bio": "bio",
+    "location": "location",
+    "email": "email",
+}
+
+LINKEDIN_ACCOUNT_VARIABLES = {
+    "username": "username",
+    "name": "name",
+    "headline": "headline",
+    "profile_url": "profile_url",
+}
+
+PROSPECT_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+LINKEDIN_ACCOUNT_PLACEHOLDER = re.compile(r"\[\[(\w+)\]\]")
+
+# CampaignSequence fields personalized for each prospect
+SEQUENCE_TEMPLATE_FIELDS = ("note", "message", "inmail_subject", "inmail_message", "email_subject", "email_message")
+
+
+def compile_template(text, placeholder, variables):
+    ''' (literal, attribute) pairs and the literal left after the last placeholder. Unknown placeholders stay in the
+        literals as they are written. '''
+
+    parts = []
+    literal = ""
+    position = 0
+
+    for match in placeholder.finditer(text or ""):
+        literal += text[position:match.start()]
+        position = match.end()
+
+        if match.group(1) in variables:
+            parts.append((literal, variables[match.group(1)]))
+            literal = ""
+        else:
+            literal += match.group(0)
+
+    return parts, literal + (text or "")[position:]
+
+
+# cached by the text itself, so an edited sequence is compiled again the first time it's rendered
+@lru_cache(maxsize=4096)
+def get_prospect_template(text):
+    return compile_template(text, PROSPECT_PLACEHOLDER, PROSPECT_VARIABLES)
+
+
+@lru_cache(maxsize=1024)
+def get_linkedin_account_template(text):
+    return compile_template(text, LINKEDIN_ACCOUNT_PLACEHOLDER, LINKEDIN_ACCOUNT_VARIABLES)
+
+
+def render(template, obj):
+    parts, tail = template
+
+    return "".join(f"{literal}{getattr(obj, attribute, None) or ''}" for literal, attribute in parts) + tail
+
+
+def render_prospect_text(text, prospect):
+    return render(get_prospect_template(text), prospect)
+
+
+def render_linkedin_account_text(text, linkedin_account):
+    return render(get_linkedin_account_template(text), linkedin_account)
+
+
+def get_unknown_variables(text, placeholder=PROSPECT_PLACEHOLDER, variables=PROSPECT_VARIABLES):
+    return sorted({variable for variable in placeholder.findall(text or "") if variable not in variables})
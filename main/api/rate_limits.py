@@ -0,0 +1,142 @@
+from random import randint
+from threading import Lock
+from time import time
+from uuid import uuid4
+from datetime import timedelta
+from django.utils import timezone
+from redis.exceptions import RedisError
+from main.models import ProspectActionLog
+from base.utils import get_redis
+
+
+WINDOW = 24 * 60 * 60
+
+# action: (ProspectActionLog.action, LinkedinAccount limit fields)
+ACTIONS = {
+    "connection_request": ("send_connection_request", "connection_requests_per_day"),
+    "messages": ("send_message", "messages_per_day"),
+    "inmails": ("send_inmail", "inmails_per_day"),
+    "like_3_posts": ("like_3_posts", "like_3_posts_per_day"),
+    "follows": ("follow", "follow_per_day"),
+    "endorse_top_5_skills": ("endorse_top_5_skills", "endorse_top_5_skills_per_day"),
+    "emails": ("send_email", "emails_per_day"),
+}
+
+# keys[1] window, keys[2] seeded marker, argv: now, window, limit, requested, member prefix, seed members...
+RESERVE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+
+if redis.call('SETNX', KEYS[2], 1) == 1 then
+    for i = 6, #ARGV, 2 do
+        redis.call('ZADD', KEYS[1], ARGV[i + 1], ARGV[i])
+    end
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+
+local available = math.max(0, limit - redis.call('ZCARD', KEYS[1]))
+local granted = math.min(requested, available)
+
+for i = 1, granted do
+    redis.call('ZADD', KEYS[1], now, ARGV[5] .. i)
+end
+
+redis.call('EXPIRE', KEYS[1], window)
+
+return {granted, available - granted}
+"""
+
+_memory_windows = {}
+_memory_limits = {}
+_memory_lock = Lock()
+
+
+def get_keys(linkedin_account, action):
+    prefix = f"rate_limit:{linkedin_account.id}:{action}"
+    return prefix, f"{prefix}:seeded", f"{prefix}:limit:{timezone.now().date()}"
+
+
+def get_seed(linkedin_account, action):
+    ''' Actions logged before the limiter knew about them, read once per account and action '''
+
+    return list(ProspectActionLog.objects.filter(
+        prospect__campaign_linkedin_account__linkedin_account=linkedin_account,
+        action=ACTIONS[action][0],
+        created_at__gte=timezone.now() - timedelta(seconds=WINDOW),
+    ).values_list("id", "created_at"))
+
+
+def get_daily_limit(linkedin_account, action):
+    ''' The random limit between the account's from and to values, picked once a day instead of on every call '''
+
+    field = ACTIONS[action][1]
+    candidate = randint(getattr(linkedin_account, f"{field}_from"), getattr(linkedin_account, f"{field}_to"))
+    window_key, seeded_key, limit_key = get_keys(linkedin_account, action)
+    redis = get_redis()
+
+    if redis is not None:
+        try:
+            redis.set(limit_key, candidate, nx=True, ex=2 * WINDOW)
+            return int(redis.get(limit_key))
+        except RedisError as e:
+            print(f"Rate limiter falls back to memory: {e}")
+
+    with _memory_lock:
+        return _memory_limits.setdefault(limit_key, candidate)
+
+
+def reserve_in_memory(linkedin_account, action, limit, requested, now):
+    window_key, seeded_key, limit_key = get_keys(linkedin_account, action)
+
+    with _memory_lock:
+        window = _memory_windows.get(window_key)
+
+    if window is None:
+        seed = [created_at.timestamp() for log_id, created_at in get_seed(linkedin_account, action)]
+
+        with _memory_lock:
+            window = _memory_windows.setdefault(window_key, seed)
+
+    with _memory_lock:
+        window[:] = [timestamp for timestamp in window if timestamp > now - WINDOW]
+        available = max(0, limit - len(window))
+        granted = min(requested, available)
+        window.extend([now] * granted)
+
+    return granted, available - granted
+
+
+def reserve(linkedin_account, action, requested=1):
+    ''' Atomically takes up to requested actions out of the account's last 24 hours, returns (granted, left). The
+        window is only kept in memory when no redis is configured, a failing redis grants nothing. '''
+
+    limit = get_daily_limit(linkedin_account, action)
+    window_key, seeded_key, limit_key = get_keys(linkedin_account, action)
+    now = time()
+    redis = get_redis()
+
+    if redis is not None:
+        try:
+            seed = []
+
+            if not redis.exists(seeded_key):
+                for log_id, created_at in get_seed(linkedin_account, action):
+                    seed += [f"log:{log_id}", created_at.timestamp()]
+
+            granted, left = redis.eval(
+                RESERVE_SCRIPT, 2, window_key, seeded_key, now, WINDOW, limit, requested, f"{uuid4().hex}:", *seed
+            )
+            return int(granted), int(left)
+        except RedisError as e:
+            # each process would count on its own window and grant the whole limit again, nothing is sent instead
+            print(f"Rate limiter denies the reservation, redis failed: {e}")
+            return 0, 0
+
+    return reserve_in_memory(linkedin_account, action, limit, requested, now)
+
+
+def available(linkedin_account, action):
+    return reserve(linkedin_account, action, 0)[1]
@@ -0,0 +1,75 @@
+from functools import reduce
+from operator import and_, or_
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+
+# table: columns of its search document, they are indexed by migration 0060_full_text_search. Emails and phone
+# numbers aren't in it, they are searched by any part of them, which the index doesn't split them into.
+SEARCH_DOCUMENTS = {
+    "main_message": ("message",),
+    "main_prospect": ("name", "headline", "location"),
+}
+
+
+def get_document_sql(table):
+    ''' Same expression as the postgres GIN index, the index is only used when they match exactly '''
+
+    columns = " || ' ' || ".join(f"coalesce({column}, '')" for column in SEARCH_DOCUMENTS[table])
+
+    return f"to_tsvector('simple', {columns})"
+
+
+def get_postgres_query(terms):
+    # every term, each one as a prefix, quoted so the tsquery syntax can't be injected
+    return " & ".join("'{}':*".format(term.replace("\\", "\\\\").replace("'", "''")) for term in terms)
+
+
+def get_sqlite_query(terms):
+    return " AND ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def get_matching_ids(table, terms):
+    ''' Subquery of the ids whose document has all the terms, None on databases without a full text index '''
+
+    if connection.vendor == "postgresql":
+        return RawSQL(
+            f"SELECT id FROM {table} WHERE {get_document_sql(table)} @@ to_tsquery('simple', %s)",
+            [get_postgres_query(terms)],
+        )
+
+    if connection.vendor == "sqlite":
+        return RawSQL(f"SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH %s", [get_sqlite_query(terms)])
+
+    return None
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    ''' ?search= against the full text index of the model. Each term matches on the index, or on one of the
+        search_icontains_fields, columns outside the document which are still matched with icontains. Databases
+        without the index fall back to search_fields. '''
+
+    def filter_queryset(self, request, queryset, view):
+        # punctuation alone isn't indexed, such terms are left to search_fields
+        terms = [term for term in self.get_search_terms(request) if any(character.isalnum() for character in term)]
+
+        if not terms:
+            return super(FullTextSearchFilter, self).filter_queryset(request, queryset, view)
+
+        conditions = []
+
+        for term in terms:
+            ids = get_matching_ids(queryset.model._meta.db_table, [term])
+
+            if ids is None:
+                return super(FullTextSearchFilter, self).filter_queryset(request, queryset, view)
+
+            conditions.append(reduce(
+                or_,
+                (Q(**{f"{field}__icontains": term}) for field in getattr(view, "search_icontains_fields", [])),
+                Q(id__in=ids),
+            ))
+
+        return queryset.filter(reduce(and_, conditions))
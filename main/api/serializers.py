@@ -4,6 +4,22 @@ from django.contrib.auth.models import User
 from accounts.api.serializers import LinkedinAccountSerializer
 from main.models import Campaign, Prospect, ProspectLabel, SearchParameter, CampaignSequence, Message, Room, CampaignLinkedinAccount, Label
 from django.utils.timesince import timesince
+from django.db.models import Manager
+from .metrics import get_campaigns_metrics
+from .stats import get_campaigns_stats
+from .statuses import get_prospects_status_timelines
+from .personalization import SEQUENCE_TEMPLATE_FIELDS, get_unknown_variables
+
+
+class CampaignListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        campaigns = list(data.all() if isinstance(data, Manager) else data)
+
+        # computed once for the whole page, the child serializer reads from it
+        self.metrics = get_campaigns_metrics(campaigns, get_campaigns_stats(campaigns))
+
+        return super(CampaignListSerializer, self).to_representation(campaigns)
 
 
 class CampaignSerializer(serializers.ModelSerializer):
@@ -31,9 +47,18 @@ class CampaignSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ("created_at", "updated_at",
                             "user", "status", "pages_crawled")
-        
+        list_serializer_class = CampaignListSerializer
+
+    def get_metrics(self, instance):
+        metrics = getattr(self.parent, "metrics", None) or getattr(self, "metrics", {})
+
+        if instance.id not in metrics:
+            self.metrics = metrics = get_campaigns_metrics([instance], get_campaigns_stats([instance]))
+
+        return metrics[instance.id]
+
     def get_total_steps_count(self, instance):
-        return instance.campaignsequence_set.count()
+        return self.get_metrics(instance)["total_steps_count"]
 
     def get_category(self, instance):
         if instance.search_url and "/sales/" in instance.search_url:
@@ -42,121 +67,49 @@ class CampaignSerializer(serializers.ModelSerializer):
         return "Linkedin"
     
     def get_connected_prospect_avatars(self, instance):
-        return [{"avatar" : prospect.linkedin_avatar.url, "name" : prospect.name} for prospect in Prospect.objects.filter(campaign_linkedin_account__campaign=instance, fully_crawled=True, connected = True, linkedin_avatar__isnull=False).exclude(linkedin_avatar__exact='')[:4]]
+        return self.get_metrics(instance)["connected_prospect_avatars"]
 
     def get_progress(self, instance):
-        return int((Prospect.objects.filter(campaign_linkedin_account__campaign=instance, fully_crawled=True).count() / instance.crawl_total_prospects) * 100)
+        return self.get_metrics(instance)["progress"]
 
     def get_total_prospects_fully_crawled(self, instance):
-        return Prospect.objects.filter(campaign_linkedin_account__campaign=instance, fully_crawled=True).count()
+        return self.get_metrics(instance)["total_prospects_fully_crawled"]
 
     def get_assigned(self, instance):
-        return CampaignLinkedinAccount.objects.filter(campaign = instance, linkedin_account__avatar__isnull=False).distinct().values("linkedin_account__name", "linkedin_account__avatar")[:7]
+        return self.get_metrics(instance)["assigned"]
 
     def get_total_prospects_crawled(self, instance):
-        return Prospect.objects.filter(campaign_linkedin_account__campaign=instance).count()
+        return self.get_metrics(instance)["total_prospects_crawled"]
     
     def get_total_prospects_lead(self, instance):
-        return ProspectLabel.objects.filter(prospect__campaign_linkedin_account__campaign=instance, label__name="Lead").count()
+        return self.get_metrics(instance)["total_prospects_lead"]
     
     def get_total_prospects_customer(self, instance):
-        return ProspectLabel.objects.filter(prospect__campaign_linkedin_account__campaign=instance, label__name="Customer").count()
+        return self.get_metrics(instance)["total_prospects_customer"]
 
     def get_total_connection_request_sent(self, instance):
-        return Prospect.objects.filter(campaign_linkedin_account__campaign=instance, connection_request_sent=True).count()
+        return self.get_metrics(instance)["total_connection_request_sent"]
 
     def get_total_connection_request_accepted(self, instance):
-        return Prospect.objects.filter(campaign_linkedin_account__campaign=instance, connection_request_sent=True, connected=True).count()
+        return self.get_metrics(instance)["total_connection_request_accepted"]
 
     def get_message_sent(self, instance):
-        message_sent = 0
-
-        for prospect in Prospect.objects.filter(campaign_linkedin_account__campaign=instance, connection_request_sent=True, connected=True, state__isnull=False).all().distinct():
-
-            for campaign_sequence in CampaignSequence.objects.filter(campaign=instance, order__lt=prospect.state.order):
-
-                if campaign_sequence.step == "send_message":
-                    message_sent += 1
-
-            if prospect.state.step == "send_message" and prospect.state_status and prospect.state_status == "Finished":
-                    message_sent += 1
-
-        return message_sent
+        return self.get_metrics(instance)["message_sent"]
     
     def get_inmail_sent(self, instance):
-        inmail_sent = 0
-
-        for prospect in Prospect.objects.filter(campaign_linkedin_account__campaign=instance, fully_crawled=True, state__isnull=False).all().distinct():
-
-            for campaign_sequence in CampaignSequence.objects.filter(campaign=instance, order__lt=prospect.state.order):
-
-                if campaign_sequence.step == "send_inmail":
-                    inmail_sent += 1
-
-            if prospect.state.step == "send_inmail" and prospect.state_status and prospect.state_status == "Finished":
-                    inmail_sent += 1
-
-        return inmail_sent
+        return self.get_metrics(instance)["inmail_sent"]
 
     def get_email_sent(self, instance):
-        email_sent = 0
-
-        for prospect in Prospect.objects.filter(campaign_linkedin_account__campaign=instance, fully_crawled=True, email__isnull=False, state__isnull=False).all().distinct():
-
-            for campaign_sequence in CampaignSequence.objects.filter(campaign=instance, order__lt=prospect.state.order):
-
-                if campaign_sequence.step == "send_email":
-                    email_sent += 1
-
-            if prospect.state.step == "send_email" and prospect.state_status and prospect.state_status == "Finished":
-                    email_sent += 1
-
-        return email_sent
+        return self.get_metrics(instance)["email_sent"]
 
     def get_liked_posts(self, instance):
-        liked_posts = 0
-
-        for prospect in Prospect.objects.filter(campaign_linkedin_account__campaign=instance, fully_crawled=True, state__isnull=False).all().distinct():
-
-            for campaign_sequence in CampaignSequence.objects.filter(campaign=instance, order__lt=prospect.state.order):
-
-                if campaign_sequence.step == "like_3_posts":
-                    liked_posts += 1
-
-            if prospect.state.step == "like_3_posts" and prospect.state_status and prospect.state_status == "Finished":
-                    liked_posts += 1
-
-        return liked_posts*3
+        return self.get_metrics(instance)["liked_posts"]
 
     def get_followed(self, instance):
-        followed = 0
-
-        for prospect in Prospect.objects.filter(campaign_linkedin_account__campaign=instance, fully_crawled=True, state__isnull=False).all().distinct():
-
-            for campaign_sequence in CampaignSequence.objects.filter(campaign=instance, order__lt=prospect.state.order):
-
-                if campaign_sequence.step == "follow":
-                    followed += 1
-
-            if prospect.state.step == "follow" and prospect.state_status and prospect.state_status == "Finished":
-                    followed += 1
-
-        return followed
+        return self.get_metrics(instance)["followed"]
     
     def get_endorsed(self, instance):
-        endorsed = 0
-
-        for prospect in Prospect.objects.filter(campaign_linkedin_account__campaign=instance, fully_crawled=True, state__isnull=False).all().distinct():
-
-            for campaign_sequence in CampaignSequence.objects.filter(campaign=instance, order__lt=prospect.state.order):
-
-                if campaign_sequence.step == "endorse_top_5_skills":
-                    endorsed += 1
-
-            if prospect.state.step == "endorse_top_5_skills" and prospect.state_status and prospect.state_status == "Finished":
-                    endorsed += 1
-
-        return endorsed*5
+        return self.get_metrics(instance)["endorsed"]
 
 
 class CampaignRetrieveSerializer(serializers.ModelSerializer):
@@ -173,6 +126,20 @@ class CampaignSequenceSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ("created_at", "updated_at",)
 
+    def validate(self, attrs):
+        errors = {}
+
+        for field in SEQUENCE_TEMPLATE_FIELDS:
+            unknown = get_unknown_variables(attrs.get(field))
+
+            if unknown:
+                errors[field] = f"Unknown variables: {', '.join(unknown)}"
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
 
 class CampaignLinkedinAccountSerializer(serializers.ModelSerializer):
 
@@ -189,6 +156,17 @@ class CampaignLinkedinAccountSerializer(serializers.ModelSerializer):
         self.fields["linkedin_account"].queryset = self.context["linkedin_accounts"]
 
 
+class ProspectListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        prospects = list(data.all() if isinstance(data, Manager) else data)
+
+        # one sequence query for the whole list, the child serializer reads from it
+        self.statuses = get_prospects_status_timelines(prospects)
+
+        return super(ProspectListSerializer, self).to_representation(prospects)
+
+
 class ProspectSerializer(serializers.ModelSerializer):
     statuses = serializers.SerializerMethodField()
     labels = serializers.SerializerMethodField()
@@ -197,144 +175,21 @@ class ProspectSerializer(serializers.ModelSerializer):
         model = Prospect
         fields = "__all__"
         read_only_fields = ("created_at", "updated_at",)
+        list_serializer_class = ProspectListSerializer
         
     def get_labels(self, instance):
-        return ProspectLabel.objects.filter(prospect = instance).values("id", "label_id", "label__name")
+        return [
+            {"id": prospect_label.id, "label_id": prospect_label.label_id, "label__name": prospect_label.label.name}
+            for prospect_label in instance.prospect_labels.all()
+        ]
 
     def get_statuses(self, instance):
+        statuses = getattr(self.parent, "statuses", None) or {}
 
-        statuses = []
-        
-        if not instance.state:
-            return [
-                {"status": "Pending", "color": "#FFB020"}
-            ]
-        
-        for campaign_sequence in CampaignSequence.objects.filter(campaign=instance.campaign_linkedin_account.campaign, order__lt = instance.state.order).order_by("order"):
-
-            if campaign_sequence.step == "send_connection_request":
-                statuses.append(
-                    {"status": "Connection Request Sent" if not instance.connected else "Connected", "color": "rgb(16, 185, 129)"})
-                    
-            elif campaign_sequence.step == "send_message":
-                statuses.append(
-                    {"status": "Message Sent", "color": "rgb(16, 185, 129)"})
-
-            elif campaign_sequence.step == "send_inmail":
-                statuses.append(
-                    {"status": "InMail Sent", "color": "rgb(16, 185, 129)"})
-
-            elif campaign_sequence.step == "like_3_posts":
-                statuses.append(
-                    {"status": "Liked 3 Posts", "color": "rgb(16, 185, 129)"})
-
-            elif campaign_sequence.step == "follow":
-                statuses.append(
-                    {"status": "Followed", "color": "rgb(16, 185, 129)"})
-
-            elif campaign_sequence.step == "endorse_top_5_skills":
-                statuses.append(
-                    {"status": "Endorsed", "color": "rgb(16, 185, 129)"})
-
-            elif campaign_sequence.step == "send_email":
-                statuses.append(
-                    {"status": "Email Sent", "color": "rgb(16, 185, 129)"})
-                
-        if instance.state.step == "send_connection_request":
-            
-            if instance.state_status == "Performing" or not instance.state_status:
-                statuses.append(
-                    {"status": "Sending Connection Request", "color": "#5048E5"})
-
-            elif instance.state_status == "Finished":
-                statuses.append({"status": "Connection Request Sent" if not instance.connected else "Connected", "color": "rgb(16, 185, 129)"})
-
-            elif instance.state_status == "Failed":
-                statuses.append(
-                    {"status": "Connection Request Failed", "color": "#D14343"})
-                
-        elif instance.state.step == "send_message":
-            
-            if instance.state_status == "Performing" or not instance.state_status:
-                statuses.append(
-                    {"status": "Sending Message", "color": "#5048E5"})
-
-            elif instance.state_status == "Finished":
-                statuses.append(
-                    {"status": "Message Sent", "color": "rgb(16, 185, 129)"})
-
-            elif instance.state_status == "Failed":
-                statuses.append(
-                    {"status": "Sending Message Failed", "color": "#D14343"})
-
-        elif instance.state.step == "send_inmail":
-            
-            if instance.state_status == "Performing" or not instance.state_status:
-                statuses.append(
-                    {"status": "Sending Inmail", "color": "#5048E5"})
-
-            elif instance.state_status == "Finished":
-                statuses.append(
-                    {"status": "Inmail Sent", "color": "rgb(16, 185, 129)"})
-
-            elif instance.state_status == "Failed":
-                statuses.append(
-                    {"status": "Sending Inmail Failed", "color": "#D14343"})
-
-        elif instance.state.step == "like_3_posts":
-            
-            if instance.state_status == "Performing" or not instance.state_status:
-                statuses.append(
-                    {"status": "Liking Posts", "color": "#5048E5"})
-
-            elif instance.state_status == "Finished":
-                statuses.append(
-                    {"status": "Liked 3 Posts", "color": "rgb(16, 185, 129)"})
-
-            elif instance.state_status == "Failed":
-                statuses.append(
-                    {"status": "Liking Post Failed", "color": "#D14343"})
-
-        elif instance.state.step == "follow":
-            if instance.state_status == "Performing" or not instance.state_status:
-                statuses.append(
-                    {"status": "Following Prospect", "color": "#5048E5"})
-
-            elif instance.state_status == "Finished":
-                statuses.append(
-                    {"status": "Followed", "color": "rgb(16, 185, 129)"})
-
-            elif instance.state_status == "Failed":
-                statuses.append(
-                    {"status": "Following Prospect Failed", "color": "#D14343"})
-
-        elif instance.state.step == "endorse_top_5_skills":
-            if instance.state_status == "Performing" or not instance.state_status:
-                statuses.append(
-                    {"status": "Endorsing Prospect", "color": "#5048E5"})
-
-            elif instance.state_status == "Finished":
-                statuses.append(
-                    {"status": "Endorsed", "color": "rgb(16, 185, 129)"})
-
-            elif instance.state_status == "Failed":
-                statuses.append(
-                    {"status": "Endorsing Failed", "color": "#D14343"})
-
-        elif instance.state.step == "send_email":
-            if instance.state_status == "Performing" or not instance.state_status:
-                statuses.append(
-                    {"status": "Sending Email", "color": "#5048E5"})
-
-            elif instance.state_status == "Finished":
-                statuses.append(
-                    {"status": "Email Sent", "color": "rgb(16, 185, 129)"})
-
-            elif instance.state_status == "Failed":
-                statuses.append(
-                    {"status": "Sending Email Failed", "color": "#D14343"})
-
-        return statuses
+        if instance.id not in statuses:
+            return get_prospects_status_timelines([instance])[instance.id]
+
+        return statuses[instance.id]
 
 
 class SearchParameterSerializer(serializers.ModelSerializer):
@@ -350,7 +205,7 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = "__all__"
-        read_only_fields = ("created_at", "updated_at", "message_from",)
+        read_only_fields = ("created_at", "updated_at", "message_from", "key",)
 
 
 class RoomSerializer(serializers.ModelSerializer):
@@ -397,7 +252,7 @@ class RoomSerializer(serializers.ModelSerializer):
         return Campaign.objects.filter(id = instance.prospect.campaign_linkedin_account.campaign.id).values()[0] if instance.prospect and instance.prospect.campaign_linkedin_account and instance.prospect.campaign_linkedin_account.campaign else {}
     
     def get_total_customer_messages(self, instance):
-        return instance.messages.filter(message_from="Prospect").count()
+        return instance.prospect_message_count
     
 
 class LabelSerializer(serializers.ModelSerializer):
@@ -0,0 +1,190 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from main.models import Campaign, CampaignLinkedinAccount, CampaignSequence, CampaignStats, Prospect
+from .metrics import COUNTERS, STEP_COUNTERS, count_steps_done, get_campaigns_counters
+
+
+# Prospect fields the campaign counters are computed from
+PROSPECT_STATS_FIELDS = (
+    "campaign_linkedin_account_id",
+    "fully_crawled",
+    "connection_request_sent",
+    "connected",
+    "email",
+    "state_id",
+    "state_status",
+)
+
+
+def get_prospect_stats_values(prospect):
+    ''' None when the prospect was loaded with some of the fields deferred '''
+
+    if any(field not in prospect.__dict__ for field in PROSPECT_STATS_FIELDS):
+        return None
+
+    return {field: prospect.__dict__[field] for field in PROSPECT_STATS_FIELDS}
+
+
+def get_campaign_sequence(campaign_id):
+    return {
+        sequence_id: (order, step)
+        for sequence_id, order, step in CampaignSequence.objects.filter(campaign_id=campaign_id).values_list("id", "order", "step")
+    }
+
+
+def get_prospect_counters(values, sequence):
+    ''' What a single prospect adds to the counters of its campaign, same rules as get_campaigns_counters '''
+
+    connected = values["connection_request_sent"] and values["connected"]
+    audiences = {
+        "connected": connected,
+        "fully_crawled": values["fully_crawled"],
+        "emailed": values["fully_crawled"] and values["email"] is not None,
+    }
+    counters = {
+        "total_prospects_crawled": 1,
+        "total_prospects_fully_crawled": int(bool(values["fully_crawled"])),
+        "total_connection_request_sent": int(bool(values["connection_request_sent"])),
+        "total_connection_request_accepted": int(bool(connected)),
+    }
+
+    if values["state_id"] not in sequence:
+        return counters
+
+    state_order, state_step = sequence[values["state_id"]]
+    sequence_steps = sorted(sequence.values())
+
+    for counter, step, audience, multiplier in STEP_COUNTERS:
+        if audiences[audience]:
+            counters[counter] = count_steps_done(
+                sequence_steps, step, state_order, state_step, values["state_status"] == "Finished"
+            ) * multiplier
+
+    return counters
+
+
+def update_campaign_stats(campaign_id, delta):
+    ''' Applies the delta in the database, returns False when the campaign has no stats row yet '''
+
+    changes = {counter: F(counter) + value for counter, value in delta.items() if value}
+
+    if not changes:
+        return CampaignStats.objects.filter(campaign_id=campaign_id).exists()
+
+    return bool(CampaignStats.objects.filter(campaign_id=campaign_id).update(**changes))
+
+
+def get_prospects_stats_delta(changes):
+    ''' {campaign_id: {counter: change}} for a batch of (old_values, new_values) pairs, one query for their campaigns
+        and one per campaign sequence '''
+
+    changes = list(changes)
+    campaign_ids = dict(
+        CampaignLinkedinAccount.objects.filter(id__in={
+            values["campaign_linkedin_account_id"] for pair in changes for values in pair if values is not None
+        }).values_list("id", "campaign_id")
+    )
+    deltas = {}
+    sequences = {}
+
+    for old_values, new_values in changes:
+        for values, sign in ((old_values, -1), (new_values, 1)):
+            if values is None:
+                continue
+
+            campaign_id = campaign_ids.get(values["campaign_linkedin_account_id"])
+
+            if campaign_id is None:
+                continue
+
+            if values["state_id"] and campaign_id not in sequences:
+                sequences[campaign_id] = get_campaign_sequence(campaign_id)
+
+            campaign_delta = deltas.setdefault(campaign_id, {})
+
+            for counter, value in get_prospect_counters(values, sequences.get(campaign_id, {})).items():
+                campaign_delta[counter] = campaign_delta.get(counter, 0) + sign * value
+
+    return deltas
+
+
+def get_prospect_stats_delta(old_values, new_values):
+    ''' {campaign_id: {counter: change}} for a prospect going from old_values to new_values '''
+
+    return get_prospects_stats_delta([(old_values, new_values)])
+
+
+def apply_campaigns_stats_delta(deltas):
+    for campaign_id, delta in deltas.items():
+        if not update_campaign_stats(campaign_id, delta):
+            rebuild_campaigns_stats([campaign_id])
+
+
+def rebuild_campaigns_stats(campaign_ids, create=True):
+    ''' Recounts the stats rows from the prospects, with create=False only existing rows are touched '''
+
+    campaigns = list(Campaign.objects.filter(id__in=campaign_ids).only("id"))
+    counters = get_campaigns_counters(campaigns)
+
+    for campaign_id, campaign_counters in counters.items():
+        if create:
+            CampaignStats.objects.update_or_create(campaign_id=campaign_id, defaults=campaign_counters)
+        else:
+            CampaignStats.objects.filter(campaign_id=campaign_id).update(**campaign_counters)
+
+    return counters
+
+
+def update_prospects(prospects, **changes):
+    ''' prospects.update(**changes) in one query, it bypasses the signals so the counters are moved here by what
+        the changes do to the rows they touch. It bypasses auto_now as well, updated_at is bumped here so the changes
+        surface in the prospect list. Changes to the stats fields have to be plain values. '''
+
+    stats_changes = {
+        Prospect._meta.get_field(field).attname: value for field, value in changes.items()
+        if Prospect._meta.get_field(field).attname in PROSPECT_STATS_FIELDS
+    }
+
+    with transaction.atomic():
+        # locked, so the rows counted are the rows updated
+        rows = list(prospects.select_for_update().values("id", *PROSPECT_STATS_FIELDS))
+
+        if not rows:
+            return 0
+
+        updated = Prospect.objects.filter(id__in=[row.pop("id") for row in rows]).update(
+            **{"updated_at": timezone.now(), **changes})
+
+        if stats_changes:
+            apply_campaigns_stats_delta(get_prospects_stats_delta((row, {**row, **stats_changes}) for row in rows))
+
+    return updated
+
+
+def create_prospects(prospects):
+    ''' Prospect.objects.bulk_create(prospects), it bypasses the signals so the counters of the new prospects are
+        added here, one query per campaign '''
+
+    prospects = Prospect.objects.bulk_create(prospects)
+    apply_campaigns_stats_delta(
+        get_prospects_stats_delta((None, get_prospect_stats_values(prospect)) for prospect in prospects))
+
+    return prospects
+
+
+def get_campaigns_stats(campaigns):
+    ''' Stored counters of the campaigns in one query, missing rows are built on the way '''
+
+    campaign_ids = [campaign.id for campaign in campaigns]
+    counters = {
+        row.pop("campaign_id"): row
+        for row in CampaignStats.objects.filter(campaign_id__in=campaign_ids).values("campaign_id", *COUNTERS)
+    }
+    missing = [campaign_id for campaign_id in campaign_ids if campaign_id not in counters]
+
+    if missing:
+        counters.update(rebuild_campaigns_stats(missing))
+
+    return counters
+
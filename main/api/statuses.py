@@ -0,0 +1,74 @@
+from .metrics import get_campaigns_sequence_steps
+
+
+DONE_COLOR = "rgb(16, 185, 129)"
+PERFORMING_COLOR = "#5048E5"
+FAILED_COLOR = "#D14343"
+
+PENDING_STATUSES = [
+    {"status": "Pending", "color": "#FFB020"}
+]
+
+# step: (status of a step already behind the prospect, performing, finished, failed)
+STEP_STATUSES = {
+    "send_connection_request": ("Connection Request Sent", "Sending Connection Request", "Connection Request Sent", "Connection Request Failed"),
+    "send_message": ("Message Sent", "Sending Message", "Message Sent", "Sending Message Failed"),
+    "send_inmail": ("InMail Sent", "Sending Inmail", "Inmail Sent", "Sending Inmail Failed"),
+    "like_3_posts": ("Liked 3 Posts", "Liking Posts", "Liked 3 Posts", "Liking Post Failed"),
+    "follow": ("Followed", "Following Prospect", "Followed", "Following Prospect Failed"),
+    "endorse_top_5_skills": ("Endorsed", "Endorsing Prospect", "Endorsed", "Endorsing Failed"),
+    "send_email": ("Email Sent", "Sending Email", "Email Sent", "Sending Email Failed"),
+}
+
+
+def get_step_status(prospect, step, status):
+
+    if step == "send_connection_request" and status == "Connection Request Sent" and prospect.connected:
+        return "Connected"
+
+    return status
+
+
+def get_status_timeline(prospect, sequence_steps):
+    ''' Statuses of the prospect from the (order, step) pairs of its campaign, no queries if state is already loaded '''
+
+    if not prospect.state:
+        return list(PENDING_STATUSES)
+
+    statuses = []
+
+    for order, step in sequence_steps:
+
+        if order >= prospect.state.order or step not in STEP_STATUSES:
+            continue
+
+        statuses.append({"status": get_step_status(prospect, step, STEP_STATUSES[step][0]), "color": DONE_COLOR})
+
+    if prospect.state.step in STEP_STATUSES:
+        done, performing, finished, failed = STEP_STATUSES[prospect.state.step]
+
+        if prospect.state_status == "Performing" or not prospect.state_status:
+            statuses.append({"status": performing, "color": PERFORMING_COLOR})
+
+        elif prospect.state_status == "Finished":
+            statuses.append({"status": get_step_status(prospect, prospect.state.step, finished), "color": DONE_COLOR})
+
+        elif prospect.state_status == "Failed":
+            statuses.append({"status": failed, "color": FAILED_COLOR})
+
+    return statuses
+
+
+def get_prospects_status_timelines(prospects):
+    ''' {prospect id: statuses} for many prospects, the sequences of all their campaigns are loaded with one query.
+        Select campaign_linkedin_account and state along with the prospects to keep it at that single query. '''
+
+    prospects = list(prospects)
+    sequence_steps = get_campaigns_sequence_steps(
+        {prospect.campaign_linkedin_account.campaign_id for prospect in prospects if prospect.state_id}
+    )
+
+    return {
+        prospect.id: get_status_timeline(prospect, sequence_steps[prospect.campaign_linkedin_account.campaign_id]) if prospect.state_id else list(PENDING_STATUSES)
+        for prospect in prospects
+    }
@@ -1,34 +1,40 @@
 from uuid import uuid4
+from celery import chord
 from celery.decorators import task, periodic_task
+from celery.exceptions import SoftTimeLimitExceeded
 from main.models import Campaign, PostSequence, Prospect, CampaignFailedReason, UserLinkedinConnection, CeleryJob, CampaignSequence, Message, CampaignLinkedinAccount, CeleryJobsLog, EngagementCampaignPost, UserLinkedinGroup
 from accounts.models import UserProfile, LinkedinAccount
 from django.contrib.auth.models import User
 from selenium import webdriver
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common import exceptions
 from time import sleep
 from datetime import timedelta, datetime
-from .utils import (fill_in_details_of_prospects_and_perform_the_step, check_salesnavigator, check_reply_and_get_conversations_for_linkedin_messaging,
+from .utils import (enrich_prospects, check_salesnavigator, check_reply_and_get_conversations_for_linkedin_messaging,
                     action_to_do_if_cookie_failed_for_campaign, get_element_with_possibilities, get_action_limits,
                     get_button_by_tag_name, send_message, crawl_prospects, send_messages, like_3_posts, follows, endorse_top_5_skills,
                     send_connection_requests, send_inmails, send_emails, send_message_in_linkedin_messaging,
                     check_reply_and_get_conversations_for_linkedin_sales_messaging, send_message_in_linkedin_sales_messaging,
                     check_if_actions_can_run_for_a_linkedin_account, auto_accept_connection_requests, add_linkedin_account_info_in_text,
-                    post_posts_on_linkedin_account, crawl_prospects_from_posts)
+                    post_posts_on_linkedin_account, crawl_prospects_from_posts, send_connection_request, send_email_to_prospect,
+                    perform_browser_step)
 from django.conf import settings
-from base.utils import start_driver, give_totally_random_number_in_float, chooseRandomly, waitRandomly, get_proxy_options
+from base.utils import give_totally_random_number_in_float, chooseRandomly, waitRandomly
+from base.browser_pool import acquire_driver, release_driver
+from base.voyager import VOYAGER_API, get_voyager_client
+from .locks import Lease, get_lock_name
+from .stats import update_prospects
+from .avatars import fetch_avatars
+from .messaging import sync_linkedin_messaging
 from selenium.webdriver.common.keys import Keys
 from selenium.common import exceptions as excep
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from django.utils import timezone
-from celery.task.control import revoke
 import tkinter as tk
-from http.cookies import SimpleCookie
-import requests
 from django.db.models import Q
 import urllib.parse
+import requests
 
 
 @task(name="run_post_campaign", time_limit=82800, soft_time_limit=82800)
@@ -67,19 +73,19 @@ def run_post_campaign(campaign_id, user_id):
 
     for campaign_and_linkedin_account in new_campaign_linkedin_accounts:
 
-        driver, success = start_driver(
+        driver, success = acquire_driver(
             campaign_and_linkedin_account.linkedin_account,
             lambda: action_to_do_if_cookie_failed_for_campaign(campaign),
             "run_post_campaign",
         )
 
         if not success:
-            driver.quit()
+            release_driver(driver)
             return
 
         post_posts_on_linkedin_account(driver, campaign_and_linkedin_account)
 
-        driver.quit()
+        release_driver(driver)
 
     return "Success"
 
@@ -135,18 +141,18 @@ def run_outreach_campaign(campaign_id, user_id, send_total_connection_requests=N
 
     for campaign_and_linkedin_account in new_campaign_linkedin_accounts:
 
-        driver, success = start_driver(
+        driver, success = acquire_driver(
             campaign_and_linkedin_account.linkedin_account,
             lambda: action_to_do_if_cookie_failed_for_campaign(campaign),
             "run_outreach_campaign",
         )
 
         if not success:
-            driver.quit()
+            release_driver(driver)
             return
 
         if "/sales/" in campaign.search_url and not check_salesnavigator(driver):
-            driver.quit()
+            release_driver(driver)
             return "Success"
 
         user_account_is_salesnavigator = True if "/sales/" in campaign.search_url else False
@@ -155,52 +161,59 @@ def run_outreach_campaign(campaign_id, user_id, send_total_connection_requests=N
             crawl_prospects(driver, campaign_and_linkedin_account,
                             user_account_is_salesnavigator)
 
-        campaign_failed = False
-        error_messages = []
+        enrich_campaign_prospects.delay(campaign_and_linkedin_account.id, fail_campaign=True)
 
-        cookie = SimpleCookie()
-        cookie.load(
-            campaign_and_linkedin_account.linkedin_account.header_cookie)
-        cookies = {k: v.value for k, v in cookie.items()}
-        headers = {
-            "Csrf-Token": campaign_and_linkedin_account.linkedin_account.header_csrf_token}
-        proxies = get_proxy_options(
-            campaign_and_linkedin_account.linkedin_account.proxy)["proxy"]
+        sleep(give_totally_random_number_in_float())
 
-        for retry in range(5):
-            try:
-                prospects = Prospect.objects.filter(campaign_linkedin_account=campaign_and_linkedin_account, fully_crawled=False)[
-                    :get_action_limits(campaign_and_linkedin_account, "fully_crawl")]
-                fill_in_details_of_prospects_and_perform_the_step(
-                    driver, campaign_and_linkedin_account, user_account_is_salesnavigator, prospects, cookies, headers, proxies)
-                campaign_failed = False
-                break
-            except Exception as e:
-                campaign_failed = True
-                print(str(e))
-                error_messages.append(str(e))
+        release_driver(driver)
 
-        if campaign_failed:
-            campaign.status = "Failed"
+    return "Success"
 
-            for error_msg in error_messages:
-                CampaignFailedReason.objects.create(
-                    reason=error_msg, campaign=campaign)
 
-        sleep(give_totally_random_number_in_float())
+@task(name="enrich_campaign_prospects", time_limit=3300, soft_time_limit=3300)
+def enrich_campaign_prospects(campaign_linkedin_account_id, fail_campaign=False):
+    ''' Runs on the enrichment queue, no browser needed '''
 
-        driver.quit()
+    campaign_and_linkedin_account = CampaignLinkedinAccount.objects.select_related(
+        "campaign", "linkedin_account").filter(id=campaign_linkedin_account_id).first()
 
-    return "Success"
+    if not campaign_and_linkedin_account:
+        return "Campaign Linkedin Account Doesn't Exist!"
 
+    error_messages = []
 
-@periodic_task(run_every=timedelta(hours=1), time_limit=3300, soft_time_limit=3300, bind=True)
-def crawl_post_campaign_prospects(self, user_id=None, initial={"connected": True, "ready_for_use": True}, override_profile_arguments=[]):
-    current_time_1Halfhours_behind = timezone.now() - timedelta(minutes=90)
+    for retry in range(settings.TOTAL_RETRIES):
+        try:
+            prospects = Prospect.objects.filter(campaign_linkedin_account=campaign_and_linkedin_account, fully_crawled=False)[
+                :get_action_limits(campaign_and_linkedin_account, "fully_crawl")]
+            enrich_prospects(campaign_and_linkedin_account, prospects)
+            return "Success"
+        except Exception as e:
+            print(str(e))
+            error_messages.append(str(e))
+
+    if fail_campaign:
+        campaign = campaign_and_linkedin_account.campaign
+        campaign.status = "Failed"
+        campaign.save()
 
-    if CeleryJobsLog.objects.filter(started_at__gt=current_time_1Halfhours_behind, finished_at__isnull=True, action="crawl_post_campaign_prospects").exists():
-        return print("The Previous job hasn't finished yet!")
+        for error_msg in error_messages:
+            CampaignFailedReason.objects.create(
+                reason=error_msg, campaign=campaign)
 
+    return "Failed"
+
+
+@task(name="fetch_prospect_avatars", time_limit=600, soft_time_limit=600)
+def fetch_prospect_avatars(avatars):
+    ''' [(prospect_id, source_url)] of freshly enriched prospects '''
+
+    return f"{fetch_avatars(avatars)} avatars stored"
+
+
+@periodic_task(run_every=timedelta(hours=1), time_limit=3300, soft_time_limit=3300, bind=True)
+def crawl_post_campaign_prospects(self, user_id=None, initial={"connected": True, "ready_for_use": True}, override_profile_arguments=[]):
+    # kept for the record only, overlapping runs are sorted out per linkedin account by the leases below
     job = CeleryJobsLog.objects.create(
         celery_job = self.request.id,
         # celery_job=uuid4(),
@@ -208,17 +221,9 @@ def crawl_post_campaign_prospects(self, user_id=None, initial={"connected": True
         started_at=timezone.now(),
     )
 
-    rotten_jobs = CeleryJobsLog.objects.filter(
-        started_at__lte=current_time_1Halfhours_behind, finished_at__isnull=True, action="crawl_post_campaign_prospects").all()
-
-    for job in rotten_jobs:
-        revoke(job.celery_job, terminate=True)
-
-    rotten_jobs.delete()
-
     try:
 
-        linkedin_account_filter = initial
+        linkedin_account_filter = dict(initial)
 
         if user_id:
             linkedin_account_filter["profile__user_id"] = user_id
@@ -234,33 +239,39 @@ def crawl_post_campaign_prospects(self, user_id=None, initial={"connected": True
             if not check_if_actions_can_run_for_a_linkedin_account(linkedin_account):
                 continue
 
-            driver, success = start_driver(
-                linkedin_account, action="crawl_post_campaign_prospects")
+            with Lease(get_lock_name(linkedin_account.id, "crawl_post_campaign_prospects")) as lease:
 
-            if not success:
-                driver.quit()
-                continue
+                if lease.token is None:
+                    print(f"The previous crawl of linkedin account {linkedin_account.id} hasn't finished yet!")
+                    continue
 
-            sleep(give_totally_random_number_in_float())
+                driver, success = acquire_driver(
+                    linkedin_account, action="crawl_post_campaign_prospects")
 
-            for campaign in Campaign.objects.filter(user=linkedin_account.profile.user, type="post").exclude(status="Stopped"):
+                if not success:
+                    release_driver(driver)
+                    continue
+
+                sleep(give_totally_random_number_in_float())
 
-                sequences = PostSequence.objects.filter(
-                    campaign=campaign).order_by("order")
+                for campaign in Campaign.objects.filter(user=linkedin_account.profile.user, type="post").exclude(status="Stopped"):
 
-                campaign_linkedin_account = CampaignLinkedinAccount.objects.filter(
-                    campaign=campaign,
-                    linkedin_account=linkedin_account,
-                ).first()
+                    sequences = PostSequence.objects.filter(
+                        campaign=campaign).order_by("order")
 
-                posted_posts = EngagementCampaignPost.objects.filter(
-                    campaign_linkedin_account=campaign_linkedin_account,
-                )
+                    campaign_linkedin_account = CampaignLinkedinAccount.objects.filter(
+                        campaign=campaign,
+                        linkedin_account=linkedin_account,
+                    ).first()
 
-                crawl_prospects_from_posts(
-                    driver, campaign_linkedin_account, posted_posts)
+                    posted_posts = EngagementCampaignPost.objects.filter(
+                        campaign_linkedin_account=campaign_linkedin_account,
+                    )
 
-            driver.quit()
+                    crawl_prospects_from_posts(
+                        driver, campaign_linkedin_account, posted_posts)
+
+                release_driver(driver)
 
     except Exception as e:
         job.error = True
@@ -272,118 +283,215 @@ def crawl_post_campaign_prospects(self, user_id=None, initial={"connected": True
     return "Success"
 
 
-@periodic_task(run_every=timedelta(hours=1), time_limit=3300, soft_time_limit=3300, bind=True)
-def perform_campaign_actions(self, user_id=None, initial={"connected": True, "ready_for_use": True}, override_profile_arguments=[]):
+def perform_linkedin_account_actions(linkedin_account):
+    ''' Schedules the next paced actions of every sequence step of the account's running campaigns '''
 
-    current_time_1Halfhours_behind = timezone.now() - timedelta(minutes=90)
+    for campaign in Campaign.objects.filter(user=linkedin_account.profile.user).exclude(status="Stopped"):
 
-    if CeleryJobsLog.objects.filter(started_at__gt=current_time_1Halfhours_behind, finished_at__isnull=True, action="perform_campaign_actions").exists():
-        return print("The Previous job hasn't finished yet!")
+        sequences = CampaignSequence.objects.filter(
+            campaign=campaign).order_by("order")
 
-    job = CeleryJobsLog.objects.create(
-        celery_job=self.request.id,
-        action="perform_campaign_actions",
-        started_at=timezone.now(),
-    )
+        campaign_linkedin_account = CampaignLinkedinAccount.objects.filter(
+            campaign=campaign,
+            linkedin_account=linkedin_account,
+        ).first()
 
-    rotten_jobs = CeleryJobsLog.objects.filter(
-        started_at__lte=current_time_1Halfhours_behind, finished_at__isnull=True, action="perform_campaign_actions").all()
+        # a campaign of the user run by another of their accounts
+        if campaign_linkedin_account is None:
+            continue
 
-    for job in rotten_jobs:
-        revoke(job.celery_job, terminate=True)
+        # prospects are crawled on the enrichment queue, the steps below pick them up once fully crawled
+        enrich_campaign_prospects.delay(campaign_linkedin_account.id)
 
-    rotten_jobs.delete()
+        for sequence in sequences:
 
-    try:
+            if sequence.step == "send_connection_request":
+                print("send_connection_requests")
+                send_connection_requests(sequence, campaign_linkedin_account)
 
-        linkedin_account_filter = initial
+            elif sequence.step == "send_message":
+                send_messages(sequence, campaign_linkedin_account)
 
-        if user_id:
-            linkedin_account_filter["profile__user_id"] = user_id
+            elif sequence.step == "send_inmail":
+                send_inmails(sequence, campaign_linkedin_account)
 
-        linkedin_accounts = LinkedinAccount.objects.filter(
-            **linkedin_account_filter).order_by("profile").distinct()
+            elif sequence.step == "like_3_posts":
+                like_3_posts(sequence, campaign_linkedin_account)
 
-        for linkedin_account in linkedin_accounts:
+            elif sequence.step == "follow":
+                follows(sequence, campaign_linkedin_account)
 
-            for argument in override_profile_arguments:
-                setattr(linkedin_account, argument["key"], argument["value"])
+            elif sequence.step == "endorse_top_5_skills":
+                endorse_top_5_skills(sequence, campaign_linkedin_account)
 
-            if not check_if_actions_can_run_for_a_linkedin_account(linkedin_account):
-                continue
+            elif sequence.step == "send_email":
+                send_emails(sequence, campaign_linkedin_account)
+
+    return "Success"
 
-            driver, success = start_driver(
-                linkedin_account, action="perform_campaign_actions")
+
+@task(name="perform_prospect_step", bind=True, time_limit=600, soft_time_limit=600, max_retries=None)
+def perform_prospect_step(self, prospect_id, campaign_sequence_id):
+    ''' One paced action, queued by the step loops for its slot of the account, the worker is free until then '''
+
+    prospect = Prospect.objects.select_related("campaign_linkedin_account__linkedin_account").filter(
+        id=prospect_id, state_id=campaign_sequence_id, state_status="Performing").first()
+    campaign_sequence = CampaignSequence.objects.filter(id=campaign_sequence_id).first()
+
+    # already done by an earlier delivery of the same task, or the prospect moved on meanwhile
+    if not prospect or not campaign_sequence:
+        return "Not Scheduled"
+
+    linkedin_account = prospect.campaign_linkedin_account.linkedin_account
+
+    with Lease(get_lock_name(linkedin_account.id, "perform_prospect_step")) as lease:
+
+        if lease.token is None:
+            raise self.retry(countdown=give_totally_random_number_in_float(10, 30))
+
+        return perform_prospect_step_now(linkedin_account, prospect, campaign_sequence)
+
+
+def perform_prospect_step_now(linkedin_account, prospect, campaign_sequence):
+
+    try:
+
+        if campaign_sequence.step == "send_connection_request":
+            send_connection_request(prospect, campaign_sequence)
+
+        elif campaign_sequence.step == "send_email":
+            send_email_to_prospect(prospect, campaign_sequence)
+
+        else:
+            driver, success = acquire_driver(linkedin_account, action="perform_prospect_step")
 
             if not success:
-                driver.quit()
+                release_driver(driver)
+                raise Exception("Driver Failed")
+
+            try:
+                perform_browser_step(driver, prospect, campaign_sequence)
+            finally:
+                release_driver(driver)
+
+    except Exception as e:
+        print(str(e))
+        prospect.state_status = "Failed"
+        prospect.state_action_finish_time = timezone.now()
+        prospect.save()
+        return "Failed"
+
+    return "Success"
+
+
+@periodic_task(run_every=timedelta(hours=1), time_limit=600, soft_time_limit=600)
+def release_lost_prospect_steps():
+    ''' Prospects left Performing by a perform_prospect_step that never ran are failed, the sequence goes on from there '''
+
+    lost = update_prospects(
+        Prospect.objects.filter(
+            state_status="Performing",
+            state_action_start_time__lt=timezone.now() - timedelta(seconds=settings.PACING_LOST_STEP_AFTER),
+        ),
+        state_status="Failed",
+        state_action_finish_time=timezone.now(),
+    )
+
+    print(f"{lost} prospect steps were lost")
+
+    return lost
+
+
+@task(name="perform_campaign_actions_shard", time_limit=3300, soft_time_limit=3240)
+def perform_campaign_actions_shard(linkedin_account_ids, override_profile_arguments=[]):
+    ''' The accounts of one shard one after another, each under its own lock so no two workers drive the same account '''
+
+    results = []
+
+    for index, linkedin_account_id in enumerate(linkedin_account_ids):
+        linkedin_account = LinkedinAccount.objects.filter(id=linkedin_account_id).first()
+
+        if not linkedin_account:
+            results.append({"linkedin_account": linkedin_account_id, "status": "Doesn't Exist"})
+            continue
+
+        for argument in override_profile_arguments:
+            setattr(linkedin_account, argument["key"], argument["value"])
+
+        if not check_if_actions_can_run_for_a_linkedin_account(linkedin_account):
+            results.append({"linkedin_account": linkedin_account_id, "status": "Outside Working Hours"})
+            continue
+
+        with Lease(get_lock_name(linkedin_account_id, "perform_campaign_actions")) as lease:
+
+            if lease.token is None:
+                results.append({"linkedin_account": linkedin_account_id, "status": "Locked"})
                 continue
 
-            sleep(give_totally_random_number_in_float())
+            try:
+                status = perform_linkedin_account_actions(linkedin_account)
+                results.append({"linkedin_account": linkedin_account_id, "status": status})
+            except SoftTimeLimitExceeded:
+                # the shard still reports back so the chord completes, the rest waits for the next run
+                results += [{"linkedin_account": id_, "status": "Timed Out"} for id_ in linkedin_account_ids[index:]]
+                break
+            except Exception as e:
+                results.append({"linkedin_account": linkedin_account_id, "status": "Failed", "error": f"{e}"})
+
+    return results
+
 
-            cookie = SimpleCookie()
-            cookie.load(linkedin_account.header_cookie)
-            cookies = {k: v.value for k, v in cookie.items()}
-            headers = {"Csrf-Token": linkedin_account.header_csrf_token}
-            proxies = get_proxy_options(linkedin_account.proxy)["proxy"]
+@task(name="record_campaign_actions")
+def record_campaign_actions(shard_results, job_id):
+    ''' Chord callback, closes the job log once every shard has reported '''
 
-            for campaign in Campaign.objects.filter(user=linkedin_account.profile.user).exclude(status="Stopped"):
+    results = [result for shard in shard_results for result in shard]
+    errors = [f"{result['linkedin_account']}: {result.get('error', result['status'])}" for result in results if result["status"] in ("Failed", "Timed Out")]
 
-                sequences = CampaignSequence.objects.filter(
-                    campaign=campaign).order_by("order")
+    CeleryJobsLog.objects.filter(id=job_id).update(
+        finished_at=timezone.now(),
+        error=bool(errors),
+        error_message="\n".join(errors) or None,
+    )
+
+    return f"{len(results) - len(errors)}/{len(results)} linkedin accounts done"
 
-                campaign_linkedin_account = CampaignLinkedinAccount.objects.filter(
-                    campaign=campaign,
-                    linkedin_account=linkedin_account,
-                ).first()
 
-                user_account_is_salesnavigator = True if "/sales/" in campaign.search_url else False
+def get_shards(items, total):
+    ''' Round robin, so the accounts of one profile don't all end up on the same shard '''
 
-                prospects = Prospect.objects.filter(
-                    campaign_linkedin_account=campaign_linkedin_account,
-                    fully_crawled=False
-                )[:get_action_limits(campaign_linkedin_account, "fully_crawl")]
+    return [shard for shard in (items[index::total] for index in range(total)) if shard]
 
-                for sequence in sequences:
 
-                    if sequence.step == "send_connection_request":
-                        print("send_connection_requests")
-                        send_connection_requests(
-                            sequence, campaign_linkedin_account, cookies, headers, proxies)
+@periodic_task(run_every=timedelta(hours=1), time_limit=3300, soft_time_limit=3300, bind=True)
+def perform_campaign_actions(self, user_id=None, initial={"connected": True, "ready_for_use": True}, override_profile_arguments=[]):
 
-                    elif sequence.step == "send_message":
-                        send_messages(driver, sequence,
-                                      campaign_linkedin_account)
+    # kept for the record only, an account still busy from the previous run is skipped by its lease
+    job = CeleryJobsLog.objects.create(
+        celery_job=self.request.id,
+        action="perform_campaign_actions",
+        started_at=timezone.now(),
+    )
 
-                    elif sequence.step == "send_inmail":
-                        send_inmails(driver, sequence,
-                                     campaign_linkedin_account)
+    try:
 
-                    elif sequence.step == "like_3_posts":
-                        like_3_posts(driver, sequence,
-                                     campaign_linkedin_account)
+        linkedin_account_filter = dict(initial)
 
-                    elif sequence.step == "follow":
-                        follows(driver, sequence, campaign_linkedin_account)
+        if user_id:
+            linkedin_account_filter["profile__user_id"] = user_id
 
-                    elif sequence.step == "endorse_top_5_skills":
-                        endorse_top_5_skills(
-                            driver, sequence, campaign_linkedin_account)
+        linkedin_account_ids = list(LinkedinAccount.objects.filter(
+            **linkedin_account_filter).order_by("profile").distinct().values_list("id", flat=True))
 
-                    elif sequence.step == "send_email":
-                        send_emails(sequence, campaign_linkedin_account)
+        shards = get_shards(linkedin_account_ids, settings.CAMPAIGN_ACTIONS_MAX_CONCURRENCY)
 
-                for retry in range(2):
-                    try:
-                        fill_in_details_of_prospects_and_perform_the_step(
-                            driver, campaign_linkedin_account, user_account_is_salesnavigator, prospects, cookies, headers, proxies)
-                        break
-                    except Exception as e:
-                        print(
-                            "\n\n Error in fill_in_details_of_prospects_and_perform_the_step of perform actions \n\n")
-                        print(str(e))
+        if shards:
+            # the job is closed by record_campaign_actions once every shard is done
+            chord(
+                perform_campaign_actions_shard.s(shard, override_profile_arguments) for shard in shards
+            )(record_campaign_actions.s(str(job.id)))
 
-            driver.quit()
+            return f"{len(linkedin_account_ids)} linkedin accounts in {len(shards)} shards"
 
     except Exception as e:
         job.error = True
@@ -395,13 +503,9 @@ def perform_campaign_actions(self, user_id=None, initial={"connected": True, "re
     return "Success"
 
 
-# @task(name="check_user_connections")
-@periodic_task(run_every=timedelta(hours=1), time_limit=3000, soft_time_limit=3000)
-def check_user_connections(user_id=None, initial={"connected": True, "ready_for_use": True}, override_profile_arguments=[]):
-
-    print("HERE", "check_user_connections")
+def get_connection_linkedin_accounts(user_id=None, initial={"connected": True, "ready_for_use": True}):
 
-    linkedin_account_filter = initial
+    linkedin_account_filter = dict(initial)
 
     if user_id:
         linkedin_account_filter["profile__user_id"] = user_id
@@ -409,86 +513,181 @@ def check_user_connections(user_id=None, initial={"connected": True, "ready_for_
     linkedin_account_filter["header_csrf_token__isnull"] = False
     linkedin_account_filter["header_cookie__isnull"] = False
 
-    linkedin_accounts = LinkedinAccount.objects.filter(
+    return LinkedinAccount.objects.filter(
         **linkedin_account_filter).order_by("profile").exclude(
             header_csrf_token="",
             header_cookie=""
     ).distinct()
 
-    for linkedin_account in linkedin_accounts:
 
-        for argument in override_profile_arguments:
-            setattr(linkedin_account, argument["key"], argument["value"])
+def get_connection_created_at(connection):
+    created_at = connection.get("createdAt")
 
-        cookie = SimpleCookie()
-        cookie.load(linkedin_account.header_cookie)
-        cookies = {k: v.value for k, v in cookie.items()}
-        headers = {"Csrf-Token": linkedin_account.header_csrf_token}
-        start_ = 0
-        prospects_exist_in_campaigns = 0
+    return datetime.fromtimestamp(created_at / 1000, timezone.utc) if created_at else None
 
-        while True:
 
-            if prospects_exist_in_campaigns > 35:
-                print("No new connections")
-                break
+def sync_user_connections(linkedin_account, full=False):
+    ''' Pages the connections newest first. The hourly sync stops at the account's cursor, a full one reads all of
+        them and forgets the connections that are gone. '''
 
-            url = f'https://www.linkedin.com/voyager/api/relationships/dash/connections?decorationId=com.linkedin.voyager.dash.deco.web.mynetwork.ConnectionListWithProfile-15&count=40&q=search&sortType=RECENTLY_ADDED&start={start_}'
-            response = requests.get(url, cookies=cookies, headers=headers, proxies=get_proxy_options(
-                linkedin_account.proxy)["proxy"])
-            
-            response = response.json()['elements']
+    client = get_voyager_client(linkedin_account)
+    start_ = 0
+    prospects_exist_in_campaigns = 0
+    cursor = None
+    reached_cursor = False
+    reached_end = False
+    seen_profile_urls = set()
 
-            if not response:
-                break
+    while True:
 
-            for prospect in response:
-                try:
-                    prospect_info = prospect["connectedMemberResolutionResult"]
-                except KeyError as e:
-                    continue
+        if not full and prospects_exist_in_campaigns > 35:
+            print("No new connections")
+            break
 
-                profile_url = f"https://www.linkedin.com/in/{prospect_info['publicIdentifier']}/"
-                profile_url2 = f"https://www.linkedin.com/in/{prospect_info['entityUrn'].split('fsd_profile:')[-1]}/"
+        url = f'{VOYAGER_API}/relationships/dash/connections?decorationId=com.linkedin.voyager.dash.deco.web.mynetwork.ConnectionListWithProfile-15&count=40&q=search&sortType=RECENTLY_ADDED&start={start_}'
+        response = client.get_json(url)['elements']
 
-                if not UserLinkedinConnection.objects.filter(linkedin_account=linkedin_account, linkedin_profile_url=profile_url).first():
-                    UserLinkedinConnection.objects.create(
-                        linkedin_account=linkedin_account,
-                        linkedin_profile_url=profile_url
-                    )
-                    prospects_exist_in_campaigns = 0
-                else:
-                    prospects_exist_in_campaigns += 1
+        if not response:
+            reached_end = True
+            break
 
-                prospect_instances = Prospect.objects.filter(
-                    Q(linkedin_profile_url=profile_url) | Q(
-                        linkedin_profile_url=profile_url2),
-                    Q(connected=False) | Q(connection_request_sent=False),
-                    campaign_linkedin_account__linkedin_account=linkedin_account,
+        profile_urls = []
+        prospect_profile_urls = []
 
-                ).distinct()
+        for prospect in response:
+            try:
+                prospect_info = prospect["connectedMemberResolutionResult"]
+            except KeyError as e:
+                continue
 
-                for instance in prospect_instances:
-                    instance.connected = True
-                    instance.connection_request_sent = True
-                    instance.save()
+            profile_url = f"https://www.linkedin.com/in/{prospect_info['publicIdentifier']}/"
+            created_at = get_connection_created_at(prospect)
 
-            start_ += 40
+            if cursor is None:
+                cursor = (profile_url, created_at)
 
-            sleep(give_totally_random_number_in_float(20, 30))
+            # the cursor connection itself may have been removed since, anything older is known as well
+            if not full and (
+                profile_url == linkedin_account.connections_cursor_url or
+                created_at and linkedin_account.connections_cursor_created_at and created_at < linkedin_account.connections_cursor_created_at
+            ):
+                reached_cursor = True
+                break
+
+            profile_urls.append(profile_url)
+            prospect_profile_urls += [profile_url, f"https://www.linkedin.com/in/{prospect_info['entityUrn'].split('fsd_profile:')[-1]}/"]
+
+        seen_profile_urls.update(profile_urls)
 
-        for connection in UserLinkedinConnection.objects.filter(linkedin_account=linkedin_account).all():
+        existing_profile_urls = set(UserLinkedinConnection.objects.filter(
+            linkedin_account=linkedin_account, linkedin_profile_url__in=profile_urls).values_list("linkedin_profile_url", flat=True))
 
-            prospect_instances = Prospect.objects.filter(
+        for profile_url in profile_urls:
+            if profile_url not in existing_profile_urls:
+                prospects_exist_in_campaigns = 0
+            else:
+                prospects_exist_in_campaigns += 1
+
+        UserLinkedinConnection.objects.bulk_create([
+            UserLinkedinConnection(linkedin_account=linkedin_account, linkedin_profile_url=profile_url)
+            for profile_url in dict.fromkeys(profile_urls) if profile_url not in existing_profile_urls
+        ], ignore_conflicts=True)
+
+        update_prospects(
+            Prospect.objects.filter(
                 Q(connected=False) | Q(connection_request_sent=False),
                 campaign_linkedin_account__linkedin_account=linkedin_account,
-                linkedin_profile_url=connection.linkedin_profile_url
-            ).distinct()
+                linkedin_profile_url__in=prospect_profile_urls,
+            ),
+            connected=True,
+            connection_request_sent=True,
+        )
+
+        if reached_cursor:
+            break
+
+        start_ += 40
+
+        sleep(give_totally_random_number_in_float(20, 30))
+
+    # connections stored by earlier runs, for prospects added to campaigns since then
+    update_prospects(
+        Prospect.objects.filter(
+            Q(connected=False) | Q(connection_request_sent=False),
+            campaign_linkedin_account__linkedin_account=linkedin_account,
+            linkedin_profile_url__in=UserLinkedinConnection.objects.filter(
+                linkedin_account=linkedin_account).values("linkedin_profile_url"),
+        ),
+        connected=True,
+        connection_request_sent=True,
+    )
+
+    changes = {}
+
+    if cursor is not None:
+        changes["connections_cursor_url"], changes["connections_cursor_created_at"] = cursor
+
+    if full and reached_end:
+        removed = [
+            connection_id for connection_id, profile_url in UserLinkedinConnection.objects.filter(
+                linkedin_account=linkedin_account).values_list("id", "linkedin_profile_url")
+            if profile_url not in seen_profile_urls
+        ]
+        UserLinkedinConnection.objects.filter(id__in=removed).delete()
+        changes["connections_reconciled_at"] = timezone.now()
+
+    # not save(), every save of a linkedin account queues check_user_connections again
+    LinkedinAccount.objects.filter(id=linkedin_account.id).update(**changes)
+
+
+# @task(name="check_user_connections")
+@periodic_task(run_every=timedelta(hours=1), time_limit=3000, soft_time_limit=3000)
+def check_user_connections(user_id=None, initial={"connected": True, "ready_for_use": True}, override_profile_arguments=[]):
+
+    print("HERE", "check_user_connections")
+
+    for linkedin_account in get_connection_linkedin_accounts(user_id, initial):
+
+        for argument in override_profile_arguments:
+            setattr(linkedin_account, argument["key"], argument["value"])
+
+        with Lease(get_lock_name(linkedin_account.id, "check_user_connections")) as lease:
+
+            if lease.token is None:
+                continue
+
+            sync_user_connections(linkedin_account)
+
 
-            for prospect in prospect_instances:
-                prospect.connected = True
-                prospect.connection_request_sent = True
-                prospect.save()
+@task(name="reconcile_linkedin_account_connections", time_limit=4 * 60 * 60, soft_time_limit=4 * 60 * 60)
+def reconcile_linkedin_account_connections(linkedin_account_id):
+
+    linkedin_account = LinkedinAccount.objects.filter(id=linkedin_account_id).first()
+
+    if not linkedin_account:
+        return "Linkedin Account Doesn't Exist!"
+
+    with Lease(get_lock_name(linkedin_account.id, "check_user_connections")) as lease:
+
+        if lease.token is None:
+            return "Locked"
+
+        sync_user_connections(linkedin_account, full=True)
+
+    return "Success"
+
+
+@periodic_task(run_every=timedelta(days=1), time_limit=600, soft_time_limit=600)
+def reconcile_user_connections(user_id=None, initial={"connected": True, "ready_for_use": True}):
+    ''' Full passes of the accounts not reconciled for CONNECTIONS_RECONCILE_DAYS, they catch removed connections '''
+
+    linkedin_accounts = get_connection_linkedin_accounts(user_id, initial).filter(
+        Q(connections_reconciled_at__isnull=True) |
+        Q(connections_reconciled_at__lte=timezone.now() - timedelta(days=settings.CONNECTIONS_RECONCILE_DAYS))
+    )
+
+    for linkedin_account_id in linkedin_accounts.values_list("id", flat=True):
+        reconcile_linkedin_account_connections.delay(linkedin_account_id)
 
 
 @periodic_task(run_every=timedelta(hours=1), time_limit=3000, soft_time_limit=3000)
@@ -509,11 +708,7 @@ def check_user_groups(user_id=None, initial={"connected": True, "ready_for_use":
         for argument in override_profile_arguments:
             setattr(linkedin_account, argument["key"], argument["value"])
 
-        cookie = SimpleCookie()
-        cookie.load(linkedin_account.header_cookie)
-        cookies = {k: v.value for k, v in cookie.items()}
-        headers = {"Csrf-Token": linkedin_account.header_csrf_token}
-        proxies = get_proxy_options(linkedin_account.proxy)["proxy"]
+        client = get_voyager_client(linkedin_account)
         profile_urn_in_http_format = urllib.parse.quote_plus(
             linkedin_account.profile_urn)
         start_ = 0
@@ -525,10 +720,8 @@ def check_user_groups(user_id=None, initial={"connected": True, "ready_for_use":
                 print("No new groups")
                 break
 
-            url = f'https://www.linkedin.com/voyager/api/voyagerGroupsDashGroups?decorationId=com.linkedin.voyager.dash.deco.groups.GroupListingPage-2&count=10&membershipStatuses=List(MEMBER,MANAGER,OWNER)&profileUrn={profile_urn_in_http_format}&q=member&start={start_}'
-            response = requests.get(
-                url, cookies=cookies, headers=headers, proxies=proxies)
-            response = response.json()['elements']
+            url = f'{VOYAGER_API}/voyagerGroupsDashGroups?decorationId=com.linkedin.voyager.dash.deco.groups.GroupListingPage-2&count=10&membershipStatuses=List(MEMBER,MANAGER,OWNER)&profileUrn={profile_urn_in_http_format}&q=member&start={start_}'
+            response = client.get_json(url)['elements']
 
             if not response:
                 print("no new groups")
@@ -589,18 +782,18 @@ def run_auto_accept_connection_requests(user_id=None, initial={"connected": True
 
     for linkedin_account in new_linkedin_accounts:
 
-        driver, success = start_driver(
+        driver, success = acquire_driver(
             linkedin_account, action="run_auto_accept_connection_requests")
 
         if not success:
-            driver.quit()
+            release_driver(driver)
             continue
 
         sleep(give_totally_random_number_in_float())
 
         auto_accept_connection_requests(driver, linkedin_account)
 
-        driver.quit()
+        release_driver(driver)
 
 
 @periodic_task(run_every=timedelta(minutes=15), time_limit=840, soft_time_limit=840)
@@ -643,11 +836,7 @@ def run_campaigns(user_id=None, initial={}, override_profile_arguments=[]):
 @periodic_task(run_every=timedelta(hours=1), time_limit=3000, soft_time_limit=3000, bind=True)
 def run_check_reply_and_get_conversations(self, user_id=None, initial={"connected": True, "ready_for_use": True}, override_profile_arguments=[]):
 
-    current_time_1Halfhours_behind = timezone.now() - timedelta(minutes = 90)
-
-    if CeleryJobsLog.objects.filter(started_at__gt = current_time_1Halfhours_behind, finished_at__isnull=True, action = "run_check_reply_and_get_conversations").exists():
-        return print("The Previous job hasn't finished yet!")
-
+    # kept for the record only, overlapping runs are sorted out per linkedin account by the leases below
     job = CeleryJobsLog.objects.create(
         celery_job = self.request.id,
         # celery_job = uuid4(),
@@ -655,15 +844,8 @@ def run_check_reply_and_get_conversations(self, user_id=None, initial={"connecte
         started_at = timezone.now(),
     )
 
-    rotten_jobs = CeleryJobsLog.objects.filter(started_at__lte = current_time_1Halfhours_behind, finished_at__isnull=True, action = "run_check_reply_and_get_conversations").all()
-
-    for job in rotten_jobs:
-        revoke(job.celery_job, terminate=True)
-
-    rotten_jobs.delete()
-
     try:
-        linkedin_account_filter = initial
+        linkedin_account_filter = dict(initial)
 
         if user_id:
             linkedin_account_filter["profile__user_id"] = user_id
@@ -676,34 +858,58 @@ def run_check_reply_and_get_conversations(self, user_id=None, initial={"connecte
             for argument in override_profile_arguments:
                 setattr(linkedin_account, argument["key"], argument["value"])
 
-            driver, success = start_driver(
-                linkedin_account, action="run_check_reply_and_get_conversations")
+            with Lease(get_lock_name(linkedin_account.id, "run_check_reply_and_get_conversations")) as lease:
 
-            sleep(give_totally_random_number_in_float())
+                if lease.token is None:
+                    print(f"The previous check of linkedin account {linkedin_account.id} hasn't finished yet!")
+                    continue
 
-            if not success:
-                driver.quit()
-                continue
-            
-            if not check_salesnavigator(driver):
-                driver.quit()
-                continue
+                try:
+                    print(f"{sync_linkedin_messaging(linkedin_account)} new messages for {linkedin_account}")
+                    synced = True
+                except (requests.RequestException, KeyError, ValueError) as e:
+                    print(f"Voyager messaging sync of {linkedin_account} failed, falling back to the browser: {e}")
+                    synced = False
+
+                # the sales navigator inbox is only scraped for accounts with sales navigator prospects
+                has_sales_prospects = Prospect.objects.filter(
+                    campaign_linkedin_account__linkedin_account=linkedin_account,
+                    linkedin_sales_navigator_profile_url__isnull=False,
+                ).exclude(linkedin_sales_navigator_profile_url="").exists()
 
-            try:
-                check_reply_and_get_conversations_for_linkedin_messaging(
-                    driver, linkedin_account)  # linkedin messaging
-            except Exception as e:
-                print(e)
-                print(linkedin_account, "Not Working The Linkedin Messages")
+                if synced and not has_sales_prospects:
+                    continue
 
-            try:
-                check_reply_and_get_conversations_for_linkedin_sales_messaging(
-                    driver, linkedin_account)  # linkedin Sales Messaging
-            except Exception as e:
-                print(e)
-                print(linkedin_account, "Not Working The Linkedin Sales Messages")
+                driver, success = acquire_driver(
+                    linkedin_account, action="run_check_reply_and_get_conversations")
+
+                sleep(give_totally_random_number_in_float())
+
+                if not success:
+                    release_driver(driver)
+                    continue
+                
+                if not check_salesnavigator(driver):
+                    release_driver(driver)
+                    continue
+
+                if not synced:
+                    try:
+                        check_reply_and_get_conversations_for_linkedin_messaging(
+                            driver, linkedin_account)  # linkedin messaging
+                    except Exception as e:
+                        print(e)
+                        print(linkedin_account, "Not Working The Linkedin Messages")
+
+                if has_sales_prospects:
+                    try:
+                        check_reply_and_get_conversations_for_linkedin_sales_messaging(
+                            driver, linkedin_account)  # linkedin Sales Messaging
+                    except Exception as e:
+                        print(e)
+                        print(linkedin_account, "Not Working The Linkedin Sales Messages")
 
-            driver.quit()
+                release_driver(driver)
     except Exception as e:
         job.error = True
         job.error_message = f"{e}"
@@ -716,11 +922,11 @@ def run_check_reply_and_get_conversations(self, user_id=None, initial={"connecte
 def send_message(message_id):
     message = Message.objects.filter(id=message_id).first()
 
-    driver, success = start_driver(
+    driver, success = acquire_driver(
         message.room.linkedin_account, action="send_message")
 
     if not success:
-        driver.quit()
+        release_driver(driver)
         return
 
     if message.room.platform == "Linkedin":
@@ -730,4 +936,4 @@ def send_message(message_id):
         send_message_in_linkedin_sales_messaging(
             driver, message)  # linkedin messaging
 
-    driver.quit()
+    release_driver(driver)
@@ -1,17 +1,15 @@
-from datetime import datetime, timedelta, date
+from datetime import datetime
 from django.utils import timezone
 from django.conf import settings
-from django.core import files
-from io import BytesIO
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common import exceptions
 from main.models import (
     Campaign, Prospect, CampaignFailedReason,
-    ProspectActionLog, CampaignSequence, Message,
+    ProspectActionLog, CampaignSequence,
     Room, EmailWebHook, outreach_step_choices, LinkedinAccount,
-    CampaignLinkedinAccount, UserLinkedinConnection, PostSequence,
+    UserLinkedinConnection, PostSequence,
     EngagementCampaignPost
 )
 from time import sleep
@@ -23,12 +21,17 @@ import json
 from django.core.mail import EmailMessage
 from django.core.mail.backends.smtp import EmailBackend
 from django.utils import timezone
-from random import randint, sample
+from random import sample
 from datetime import datetime
 import pytz
 from base.utils import give_totally_random_number_in_float, chooseRandomly, waitRandomly, get_proxy_options, refresh_google_access_token
 import tkinter as tk
-import urllib.parse
+from base.voyager import VOYAGER_API, get_voyager_client
+from celery import current_app
+from .enrichment import iter_profile_records
+from . import rate_limits, pacing, blacklist, personalization
+from .stats import create_prospects
+from .conversations import save_conversation, get_thread_marker, get_changed_threads, mark_thread_seen
 
 
 def check_if_actions_can_run_for_a_linkedin_account(linkedin_account):
@@ -53,187 +56,28 @@ def create_prospect_action_log(prospect, action):
 
 
 def blacklist_check(linkedin_account, prospect):
-    words = linkedin_account.blacklist.split(",") if linkedin_account.blacklist else []
-    
-    for word in words:
-        new_word = word.lower()
-        
-        if new_word in prospect.first_name.lower():
-            return
-        
-        if new_word in prospect.last_name.lower():
-            return
-        
-        if new_word in prospect.name.lower():
-            return
-        
-        if new_word in prospect.headline.lower():
-            return
-        
-        if new_word in prospect.occupation.lower():
-            return
-        
-        if new_word in prospect.current_company.lower():
-            return
-        
-        if new_word in prospect.school_university.lower():
-            return
-        
-        if new_word in prospect.bio.lower():
-            return
-        
-        if new_word in prospect.location.lower():
-            return
-        
-        if new_word in prospect.email.lower():
-            return
-        
-        if new_word in prospect.phone.lower():
-            return
-        
-        if new_word in prospect.linkedin_profile_url.lower():
-            return
-        
-        if new_word in prospect.linkedin_sales_navigator_profile_url.lower():
-            return
-        
-    return True # test passed
+    return not blacklist.is_blacklisted(linkedin_account, prospect)
 
 
 def get_action_limits(campaign_linkedin_account, action):
-    tomorrow = timezone.now() - timedelta(days=1)
-    campaigns_of_linkedin_account = CampaignLinkedinAccount.objects.filter(
-        linkedin_account=campaign_linkedin_account.linkedin_account
-    ).all().exclude(campaign__status="Finished").exclude(campaign__status="Stopped")  # only running campaigns
+    ''' How many more of the action the linkedin account can do now, nothing is reserved '''
+
+    linkedin_account = campaign_linkedin_account.linkedin_account
     batch_size = 35
 
     if action == "fully_crawl":
-        actions = ProspectActionLog.objects.filter(
-            prospect__campaign_linkedin_account=campaign_linkedin_account,
-            created_at__gte=tomorrow,
-            action=outreach_step_choices[0][0],  # Connection Request
-        )
+        # a few more than the connection requests left, so there is always someone to send one to
+        return min(batch_size, rate_limits.available(linkedin_account, "connection_request") + 5)
 
-        limit = int(campaign_linkedin_account.linkedin_account.connection_requests_per_day_to /
-                    campaigns_of_linkedin_account.count()) + 5
+    return min(batch_size, rate_limits.available(linkedin_account, action))
 
-        if actions.count() >= limit:
-            return 0
-        else:
-            need_to_do_more = limit - actions.count()
-            return batch_size if need_to_do_more > batch_size else need_to_do_more
-
-    elif action == "connection_request":
-        actions = ProspectActionLog.objects.filter(
-            prospect__campaign_linkedin_account=campaign_linkedin_account,
-            created_at__gte=tomorrow,
-            action=outreach_step_choices[0][0],  # Connection Request
-        )
 
-        limit = int(randint(campaign_linkedin_account.linkedin_account.connection_requests_per_day_from,
-                    campaign_linkedin_account.linkedin_account.connection_requests_per_day_to) / campaigns_of_linkedin_account.count())
+def reserve_action(campaign_linkedin_account, action):
+    ''' Takes one action out of the account's daily limit right before doing it, False when nothing is left '''
 
-        if actions.count() >= limit:
-            return 0
-        else:
-            need_to_do_more = limit - actions.count()
-            return batch_size if need_to_do_more > batch_size else need_to_do_more
-
-    elif action == "messages":
-        actions = ProspectActionLog.objects.filter(
-            prospect__campaign_linkedin_account=campaign_linkedin_account,
-            created_at__gte=tomorrow,
-            action=outreach_step_choices[1][0],  # Send Message
-        )
-
-        limit = int(randint(campaign_linkedin_account.linkedin_account.messages_per_day_from,
-                    campaign_linkedin_account.linkedin_account.messages_per_day_to) / campaigns_of_linkedin_account.count())
-
-        if actions.count() >= limit:
-            return 0
-        else:
-            need_to_do_more = limit - actions.count()
-            return batch_size if need_to_do_more > batch_size else need_to_do_more
-
-    elif action == "inmails":
-        actions = ProspectActionLog.objects.filter(
-            prospect__campaign_linkedin_account=campaign_linkedin_account,
-            created_at__gte=tomorrow,
-            action=outreach_step_choices[2][0],  # Send Inmail
-        )
+    granted, left = rate_limits.reserve(campaign_linkedin_account.linkedin_account, action)
 
-        limit = int(randint(campaign_linkedin_account.linkedin_account.inmails_per_day_from,
-                    campaign_linkedin_account.linkedin_account.inmails_per_day_to) / campaigns_of_linkedin_account.count())
-
-        if actions.count() >= limit:
-            return 0
-        else:
-            need_to_do_more = limit - actions.count()
-            return batch_size if need_to_do_more > batch_size else need_to_do_more
-
-    elif action == "like_3_posts":
-        actions = ProspectActionLog.objects.filter(
-            prospect__campaign_linkedin_account=campaign_linkedin_account,
-            created_at__gte=tomorrow,
-            action=outreach_step_choices[3][0],  # Like 3 Posts
-        )
-
-        limit = int(randint(campaign_linkedin_account.linkedin_account.like_3_posts_per_day_from,
-                    campaign_linkedin_account.linkedin_account.like_3_posts_per_day_to) / campaigns_of_linkedin_account.count())
-
-        if actions.count() >= limit:
-            return 0
-        else:
-            need_to_do_more = limit - actions.count()
-            return batch_size if need_to_do_more > batch_size else need_to_do_more
-
-    elif action == "follows":
-        actions = ProspectActionLog.objects.filter(
-            prospect__campaign_linkedin_account=campaign_linkedin_account,
-            created_at__gte=tomorrow,
-            action=outreach_step_choices[4][0],  # Follows
-        )
-
-        limit = int(randint(campaign_linkedin_account.linkedin_account.follow_per_day_from,
-                    campaign_linkedin_account.linkedin_account.follow_per_day_to) / campaigns_of_linkedin_account.count())
-
-        if actions.count() >= limit:
-            return 0
-        else:
-            need_to_do_more = limit - actions.count()
-            return batch_size if need_to_do_more > batch_size else need_to_do_more
-
-    elif action == "endorse_top_5_skills":
-        actions = ProspectActionLog.objects.filter(
-            prospect__campaign_linkedin_account=campaign_linkedin_account,
-            created_at__gte=tomorrow,
-            action=outreach_step_choices[5][0],  # Endorse Top 5 Skills
-        )
-
-        limit = int(randint(campaign_linkedin_account.linkedin_account.endorse_top_5_skills_per_day_from,
-                    campaign_linkedin_account.linkedin_account.endorse_top_5_skills_per_day_to) / campaigns_of_linkedin_account.count())
-
-        if actions.count() >= limit:
-            return 0
-        else:
-            need_to_do_more = limit - actions.count()
-            return batch_size if need_to_do_more > batch_size else need_to_do_more
-
-    elif action == "emails":
-        actions = ProspectActionLog.objects.filter(
-            prospect__campaign_linkedin_account=campaign_linkedin_account,
-            created_at__gte=tomorrow,
-            action=outreach_step_choices[6][0],  # Send Email
-        )
-
-        limit = int(randint(campaign_linkedin_account.linkedin_account.emails_per_day_from,
-                    campaign_linkedin_account.linkedin_account.emails_per_day_to) / campaigns_of_linkedin_account.count())
-
-        if actions.count() >= limit:
-            return 0
-        else:
-            need_to_do_more = limit - actions.count()
-            return batch_size if need_to_do_more > batch_size else need_to_do_more
+    return granted > 0
 
 
 def get_prospect_details(driver):
@@ -326,77 +170,11 @@ def get_prospect_details(driver):
 
 
 def add_linkedin_account_info_in_text(text, linkedin_account):
-
-    new_text = text
-
-    attributes = [
-        {
-            "username": "[[username]]",
-        },
-        {
-            "name": "[[name]]",
-        },
-        {
-            "headline": "[[headline]]",
-        },
-        {
-            "profile_url": "[[profile_url]]",
-        },
-    ]
-
-    for attribute in attributes:
-
-        for key, value in attribute.items():
-            new_text = new_text.replace(value, getattr(
-                linkedin_account, key) if getattr(linkedin_account, key) else "")
-
-    return new_text
+    return personalization.render_linkedin_account_text(text, linkedin_account)
 
 
 def add_prospect_info_in_text(text, prospect):
-
-    new_text = text
-
-    attributes = [
-        {
-            "first_name": "{{first_name}}",
-        },
-        {
-            "last_name": "{{last_name}}",
-        },
-        {
-            "name": "{{full_name}}",
-        },
-        {
-            "headline": "{{headline}}",
-        },
-        {
-            "occupation": "{{occupation}}",
-        },
-        {
-            "current_company": "{{company_name}}",
-        },
-        {
-            "school_university": "{{college_name}}",
-        },
-        {
-            "bio": "{{bio}}",
-        },
-        {
-            "location": "{{location}}",
-        },
-        {
-            "email": "{{email}}",
-        },
-    ]
-
-    for attribute in attributes:
-
-        for key, value in attribute.items():
-            new_text = new_text.replace(value, getattr(
-                prospect, key) if getattr(prospect, key) else "")
-
-    return new_text
+    return personalization.render_prospect_text(text, prospect)
 
 
 def get_element_with_possibilities(driver, first_wait, default_wait, *args):
@@ -554,14 +332,14 @@ def get_conversation_of_a_user_from_linkedin_messaging(driver, message_link, lin
             f".msg-thread__link-to-profile")
     except exceptions.NoSuchElementException as e:
         print("prospect_profile_link not found...")
-        return
+        return False
 
     prospects = Prospect.objects.filter(campaign_linkedin_account__linkedin_account=linkedin_account,
                                         linkedin_profile_url=prospect_profile_link.get_attribute("href")).all()
 
     if not prospects:
         print("No Prospects...")
-        return
+        return True
 
     prospect_profile_name = driver.find_element_by_css_selector(
         f".msg-entity-lockup__entity-title")
@@ -610,23 +388,17 @@ def get_conversation_of_a_user_from_linkedin_messaging(driver, message_link, lin
 
         conversations.append(message_details)
 
-    for prospect in prospects:
-        room, created = Room.objects.get_or_create(
-            linkedin_account=linkedin_account,
-            message_thread=message_link,
-            platform="Linkedin"
-        )
-        room.prospect = prospect
-        room.messages.all().delete()
-        room.save()
+    room, created = Room.objects.get_or_create(
+        linkedin_account=linkedin_account,
+        message_thread=message_link,
+        platform="Linkedin"
+    )
+    room.prospect = prospects.last()
+    room.save()
 
-        for message in conversations:
-            Message.objects.create(
-                room=room,
-                message_from=message["message_from"],
-                time=message["time"],
-                message=message["message"],
-            )
+    save_conversation(room, conversations)
+
+    return True
 
 
 def get_conversation_of_a_user_from_linkedin_sales_messaging(driver, message_link, linkedin_account):
@@ -648,7 +420,7 @@ def get_conversation_of_a_user_from_linkedin_sales_messaging(driver, message_lin
             f".conversation-insights__section>.link-without-visited-and-hover-state")
     except exceptions.NoSuchElementException as e:
         print("prospect_profile_link not found...")
-        return
+        return False
 
     prospect_profile_link_id = prospect_profile_link.get_attribute(
         "href").split("people/")[-1].split(",")[0]
@@ -659,7 +431,7 @@ def get_conversation_of_a_user_from_linkedin_sales_messaging(driver, message_lin
 
     if not prospects:
         print("No Prospects...")
-        return
+        return True
 
     messages_raw = driver.find_elements_by_css_selector(
         "li>article")
@@ -707,24 +479,17 @@ def get_conversation_of_a_user_from_linkedin_sales_messaging(driver, message_lin
 
         conversations.append(message_details)
 
-    for prospect in prospects:
+    room, created = Room.objects.get_or_create(
+        linkedin_account=linkedin_account,
+        message_thread=message_link,
+        platform="Linkedin Sales"
+    )
+    room.prospect = prospects.last()
+    room.save()
 
-        room, created = Room.objects.get_or_create(
-            linkedin_account=linkedin_account,
-            message_thread=message_link,
-            platform="Linkedin Sales"
-        )
-        room.prospect = prospect
-        room.messages.all().delete()
-        room.save()
+    save_conversation(room, conversations)
 
-        for message in conversations:
-            Message.objects.create(
-                room=room,
-                message_from=message["message_from"],
-                time=message["time"],
-                message=message["message"],
-            )
+    return True
 
 
 def check_reply_and_get_conversations_for_linkedin_messaging(driver, linkedin_account):
@@ -740,40 +505,14 @@ def check_reply_and_get_conversations_for_linkedin_messaging(driver, linkedin_ac
     msg_users = driver.find_elements_by_css_selector(
         ".msg-conversation-listitem__link")
 
-    message_users = []
-
-    for msg_user in msg_users:
-
-        message_time = msg_user.find_element_by_css_selector(
-            ".msg-conversation-listitem__time-stamp").text
-        message_link = msg_user.get_attribute("href")
+    # name, snippet and time of the last message as listed, only threads where they changed are opened
+    threads = {msg_user.get_attribute("href"): get_thread_marker(msg_user.text) for msg_user in msg_users}
 
-        if not "am" in message_time.lower() and not "pm" in message_time.lower():
-            continue
-
-        message_time_date_time = datetime.strptime(
-            message_time, '%H:%M %p').time()
-        now = datetime.strptime(datetime.now().strftime(
-            "%I:%M %p"), '%H:%M %p').time()
-
-        dif = datetime.combine(
-            date.today(), now) - datetime.combine(date.today(), message_time_date_time)
-        difference_in_hours = dif.seconds/3600
-        difference_in_hours = 1
-
-        if difference_in_hours > 4:
-            print("You're old message...")
-            continue
-
-        message_users.append({
-            "message_time": message_time,
-            "message_link": message_link,
-        })
-
-    for msg_user in message_users:
-        get_conversation_of_a_user_from_linkedin_messaging(
-            driver, msg_user["message_link"], linkedin_account)
-        # break
+    for message_link in get_changed_threads(linkedin_account, "Linkedin", threads):
+        # a thread that didn't load is opened again on the next check
+        if get_conversation_of_a_user_from_linkedin_messaging(
+                driver, message_link, linkedin_account):
+            mark_thread_seen(linkedin_account, "Linkedin", message_link, threads[message_link])
 
     return "Success"
 
@@ -804,39 +543,13 @@ def check_reply_and_get_conversations_for_linkedin_sales_messaging(driver, linke
     msg_users = WebDriverWait(driver, 2*60).until(
         EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".conversation-list-item__link")))
 
-    message_users = []
-
-    for msg_user in msg_users:
-        message_time = msg_user.find_element_by_css_selector(
-            ".conversation-list-item__timestamp").text
-        message_link = msg_user.get_attribute("href")
-
-        if not "am" in message_time.lower() and not "pm" in message_time.lower():
-            continue
+    threads = {msg_user.get_attribute("href"): get_thread_marker(msg_user.text) for msg_user in msg_users}
 
-        message_time_date_time = datetime.strptime(
-            message_time, '%H:%M %p').time()
-        now = datetime.strptime(datetime.now().strftime(
-            "%I:%M %p"), '%H:%M %p').time()
-
-        dif = datetime.combine(
-            date.today(), now) - datetime.combine(date.today(), message_time_date_time)
-        difference_in_hours = dif.seconds/3600
-
-        print(difference_in_hours)
-
-        if difference_in_hours > 4:
-            print("You're old message...")
-            continue
-
-        message_users.append({
-            "message_time": message_time,
-            "message_link": message_link,
-        })
-
-    for msg_user in message_users:
-        get_conversation_of_a_user_from_linkedin_sales_messaging(
-            driver, msg_user["message_link"], linkedin_account)
+    for message_link in get_changed_threads(linkedin_account, "Linkedin Sales", threads):
+        # a thread that didn't load is opened again on the next check
+        if get_conversation_of_a_user_from_linkedin_sales_messaging(
+                driver, message_link, linkedin_account):
+            mark_thread_seen(linkedin_account, "Linkedin Sales", message_link, threads[message_link])
 
     return "Success"
 
@@ -917,20 +630,6 @@ def action_to_do_if_cookie_failed_for_campaign(campaign):
     return "User LinkedIn Account Isn't Properly Connected Because There Is No Cookie File!"
 
 
-def get_avatar(url, prospect):
-    if "data:image" in url or not "http" in url:
-        return None
-
-    response = requests.get(url)
-
-    if response.status_code != requests.codes.ok:
-        return None
-
-    fp = BytesIO()
-    fp.write(response.content)
-    prospect.linkedin_avatar.save(f"{prospect.id}.jpg", files.File(fp))
-
-
 def get_email(email, prospect):
 
     if email:
@@ -1018,7 +717,7 @@ def auto_accept_connection_requests(driver, linkedin_account):
         sleep(give_totally_random_number_in_float(13, 21.2))
 
 
-def send_connection_requests(campaign_sequence, campaign_linkedin_account, cookies, headers, proxies):
+def send_connection_requests(campaign_sequence, campaign_linkedin_account):
     prospect_filters = {
         "campaign_linkedin_account": campaign_linkedin_account,
         "fully_crawled": True,
@@ -1033,8 +732,9 @@ def send_connection_requests(campaign_sequence, campaign_linkedin_account, cooki
         prospect_filters["state__isnull"] = True
         prospect_filters["state_action_finish_time__isnull"] = True
 
-    prospects = Prospect.objects.filter(**prospect_filters).exclude(
-        linkedin_profile_url__exact="", state_status="Performing")
+    # queued for a later slot, the prospect is on its way to this step already
+    prospects = Prospect.objects.filter(**prospect_filters).exclude(state_status="Performing").exclude(
+        linkedin_profile_url__exact="")
 
     if campaign_sequence.order:
         prospects = prospects.exclude(state_action_finish_time__isnull=True)
@@ -1052,12 +752,15 @@ def send_connection_requests(campaign_sequence, campaign_linkedin_account, cooki
                 print(f"not perform because of duration {dif}")
                 continue
 
-        send_connection_request(prospect, campaign_sequence, cookies, headers, proxies)
+        eta = pacing.get_next_slot(campaign_linkedin_account.linkedin_account_id)
+
+        if eta is None or not reserve_action(campaign_linkedin_account, "connection_request"):
+            break
 
-        sleep(give_totally_random_number_in_float(60, 120))
+        pacing.schedule_prospect_step(prospect, campaign_sequence, eta)
 
 
-def send_messages(driver, campaign_sequence, campaign_linkedin_account):
+def send_messages(campaign_sequence, campaign_linkedin_account):
     prospect_filters = {
         "campaign_linkedin_account": campaign_linkedin_account,
         "fully_crawled": True,
@@ -1069,7 +772,8 @@ def send_messages(driver, campaign_sequence, campaign_linkedin_account):
         prospect_filters["state__isnull"] = True
         prospect_filters["state_action_finish_time__isnull"] = True
 
-    prospects = Prospect.objects.filter(**prospect_filters).exclude(
+    # queued for a later slot, the prospect is on its way to this step already
+    prospects = Prospect.objects.filter(**prospect_filters).exclude(state_status="Performing").exclude(
         linkedin_profile_url__exact="")
 
     if campaign_sequence.order:
@@ -1096,24 +800,15 @@ def send_messages(driver, campaign_sequence, campaign_linkedin_account):
 
     for prospect in new_prospects[:get_action_limits(campaign_linkedin_account, "messages")]:
 
-        driver.get(prospect.linkedin_profile_url)
-
-        sleep(give_totally_random_number_in_float())
+        eta = pacing.get_next_slot(campaign_linkedin_account.linkedin_account_id)
 
-        send_message(driver, prospect, campaign_sequence)
-
-        try:
-            WebDriverWait(driver, 3).until(EC.alert_is_present())
-            alert = driver.switch_to.alert
-            alert.accept()
-            print("alert accepted")
-        except exceptions.TimeoutException:
-            print("no alert")
+        if eta is None or not reserve_action(campaign_linkedin_account, "messages"):
+            break
 
-        sleep(give_totally_random_number_in_float(60, 120))
+        pacing.schedule_prospect_step(prospect, campaign_sequence, eta)
 
 
-def send_inmails(driver, campaign_sequence, campaign_linkedin_account):
+def send_inmails(campaign_sequence, campaign_linkedin_account):
     prospect_filters = {
         "campaign_linkedin_account": campaign_linkedin_account,
         "fully_crawled": True,
@@ -1125,7 +820,8 @@ def send_inmails(driver, campaign_sequence, campaign_linkedin_account):
         prospect_filters["state__isnull"] = True
         prospect_filters["state_action_finish_time__isnull"] = True
 
-    prospects = Prospect.objects.filter(**prospect_filters).exclude(
+    # queued for a later slot, the prospect is on its way to this step already
+    prospects = Prospect.objects.filter(**prospect_filters).exclude(state_status="Performing").exclude(
         linkedin_profile_url__exact="")
 
     if campaign_sequence.order:
@@ -1144,37 +840,15 @@ def send_inmails(driver, campaign_sequence, campaign_linkedin_account):
                 print(f"not perform because of duration {dif}")
                 continue
 
-        user_account_is_salesnavigator = False if not prospect.linkedin_sales_navigator_profile_url else True
-
-        driver.get(prospect.linkedin_profile_url if not prospect.linkedin_sales_navigator_profile_url else prospect.linkedin_sales_navigator_profile_url)
-
-        sleep(give_totally_random_number_in_float(5, 8))
-
-        if user_account_is_salesnavigator:
-            try:
-                select_sales_navigator_btn = driver.find_element_by_css_selector(
-                    ".action-select-contract")
-                select_sales_navigator_btn.click()
-                sleep(give_totally_random_number_in_float(7, 10))
-            except exceptions.NoSuchElementException:
-                print("no contact chooser screen")
-                pass
-
-        send_inmail(driver, prospect, campaign_sequence,
-                    user_account_is_salesnavigator)
+        eta = pacing.get_next_slot(campaign_linkedin_account.linkedin_account_id)
 
-        try:
-            WebDriverWait(driver, 3).until(EC.alert_is_present())
-            alert = driver.switch_to.alert
-            alert.accept()
-            print("alert accepted")
-        except exceptions.TimeoutException:
-            print("no alert")
+        if eta is None or not reserve_action(campaign_linkedin_account, "inmails"):
+            break
 
-        sleep(give_totally_random_number_in_float(60, 120))
+        pacing.schedule_prospect_step(prospect, campaign_sequence, eta)
 
 
-def like_3_posts(driver, campaign_sequence, campaign_linkedin_account):
+def like_3_posts(campaign_sequence, campaign_linkedin_account):
     prospect_filters = {
         "campaign_linkedin_account": campaign_linkedin_account,
         "fully_crawled": True,
@@ -1186,7 +860,8 @@ def like_3_posts(driver, campaign_sequence, campaign_linkedin_account):
         prospect_filters["state__isnull"] = True
         prospect_filters["state_action_finish_time__isnull"] = True
 
-    prospects = Prospect.objects.filter(**prospect_filters).exclude(
+    # queued for a later slot, the prospect is on its way to this step already
+    prospects = Prospect.objects.filter(**prospect_filters).exclude(state_status="Performing").exclude(
         linkedin_profile_url__exact="")
 
     if campaign_sequence.order:
@@ -1205,24 +880,15 @@ def like_3_posts(driver, campaign_sequence, campaign_linkedin_account):
                 print(f"not perform because of duration {dif}")
                 continue
 
-        driver.get(prospect.linkedin_profile_url)
-
-        sleep(give_totally_random_number_in_float())
-
-        like_post(driver, prospect, campaign_sequence)
+        eta = pacing.get_next_slot(campaign_linkedin_account.linkedin_account_id)
 
-        try:
-            WebDriverWait(driver, 3).until(EC.alert_is_present())
-            alert = driver.switch_to.alert
-            alert.accept()
-            print("alert accepted")
-        except exceptions.TimeoutException:
-            print("no alert")
+        if eta is None or not reserve_action(campaign_linkedin_account, "like_3_posts"):
+            break
 
-        sleep(give_totally_random_number_in_float(60, 120))
+        pacing.schedule_prospect_step(prospect, campaign_sequence, eta)
 
 
-def follows(driver, campaign_sequence, campaign_linkedin_account):
+def follows(campaign_sequence, campaign_linkedin_account):
     prospect_filters = {
         "campaign_linkedin_account": campaign_linkedin_account,
         "fully_crawled": True,
@@ -1234,7 +900,8 @@ def follows(driver, campaign_sequence, campaign_linkedin_account):
         prospect_filters["state__isnull"] = True
         prospect_filters["state_action_finish_time__isnull"] = True
 
-    prospects = Prospect.objects.filter(**prospect_filters).exclude(
+    # queued for a later slot, the prospect is on its way to this step already
+    prospects = Prospect.objects.filter(**prospect_filters).exclude(state_status="Performing").exclude(
         linkedin_profile_url__exact="")
 
     if campaign_sequence.order:
@@ -1253,24 +920,15 @@ def follows(driver, campaign_sequence, campaign_linkedin_account):
                 print(f"not perform because of duration {dif}")
                 continue
 
-        driver.get(prospect.linkedin_profile_url)
-
-        sleep(give_totally_random_number_in_float())
+        eta = pacing.get_next_slot(campaign_linkedin_account.linkedin_account_id)
 
-        follow(driver, prospect, campaign_sequence)
-
-        try:
-            WebDriverWait(driver, 3).until(EC.alert_is_present())
-            alert = driver.switch_to.alert
-            alert.accept()
-            print("alert accepted")
-        except exceptions.TimeoutException:
-            print("no alert")
+        if eta is None or not reserve_action(campaign_linkedin_account, "follows"):
+            break
 
-        sleep(give_totally_random_number_in_float(60, 120))
+        pacing.schedule_prospect_step(prospect, campaign_sequence, eta)
 
 
-def endorse_top_5_skills(driver, campaign_sequence, campaign_linkedin_account):
+def endorse_top_5_skills(campaign_sequence, campaign_linkedin_account):
     prospect_filters = {
         "campaign_linkedin_account": campaign_linkedin_account,
         "fully_crawled": True,
@@ -1283,7 +941,8 @@ def endorse_top_5_skills(driver, campaign_sequence, campaign_linkedin_account):
         prospect_filters["state__isnull"] = True
         prospect_filters["state_action_finish_time__isnull"] = True
 
-    prospects = Prospect.objects.filter(**prospect_filters).exclude(
+    # queued for a later slot, the prospect is on its way to this step already
+    prospects = Prospect.objects.filter(**prospect_filters).exclude(state_status="Performing").exclude(
         linkedin_profile_url__exact="")
 
     if campaign_sequence.order:
@@ -1310,21 +969,12 @@ def endorse_top_5_skills(driver, campaign_sequence, campaign_linkedin_account):
 
     for prospect in new_prospects[:get_action_limits(campaign_linkedin_account, "endorse_top_5_skills")]:
 
-        driver.get(prospect.linkedin_profile_url)
-
-        sleep(give_totally_random_number_in_float())
-
-        endorse_top_5_skill(driver, prospect, campaign_sequence)
+        eta = pacing.get_next_slot(campaign_linkedin_account.linkedin_account_id)
 
-        try:
-            WebDriverWait(driver, 3).until(EC.alert_is_present())
-            alert = driver.switch_to.alert
-            alert.accept()
-            print("alert accepted")
-        except exceptions.TimeoutException:
-            print("no alert")
+        if eta is None or not reserve_action(campaign_linkedin_account, "endorse_top_5_skills"):
+            break
 
-        sleep(give_totally_random_number_in_float(60, 120))
+        pacing.schedule_prospect_step(prospect, campaign_sequence, eta)
 
 
 def send_emails(campaign_sequence, campaign_linkedin_account):
@@ -1344,7 +994,8 @@ def send_emails(campaign_sequence, campaign_linkedin_account):
         prospect_filters["state__isnull"] = True
         prospect_filters["state_action_finish_time__isnull"] = True
 
-    prospects = Prospect.objects.filter(**prospect_filters).exclude(
+    # queued for a later slot, the prospect is on its way to this step already
+    prospects = Prospect.objects.filter(**prospect_filters).exclude(state_status="Performing").exclude(
         email__exact="")
 
     if campaign_sequence.order:
@@ -1363,46 +1014,98 @@ def send_emails(campaign_sequence, campaign_linkedin_account):
                 print(f"not perform because of duration {dif}")
                 continue
 
-        prospect.state = campaign_sequence
-        prospect.state_status = "Performing"
-        prospect.state_action_start_time = timezone.now()
-        prospect.save()
+        eta = pacing.get_next_slot(campaign_linkedin_account.linkedin_account_id)
+
+        if eta is None or not reserve_action(campaign_linkedin_account, "emails"):
+            break
+
+        pacing.schedule_prospect_step(prospect, campaign_sequence, eta)
+
 
-        if prospect.email and campaign_sequence.google_account and campaign_sequence.google_account.connected:
-            sent = send_email_from_google(add_prospect_info_in_text(campaign_sequence.email_subject, prospect), add_prospect_info_in_text(campaign_sequence.email_message, prospect), prospect.email,
-                                          campaign_sequence.google_account.email, campaign_sequence.google_account.access_token, campaign_sequence)
+def send_email_to_prospect(prospect, campaign_sequence):
+
+    prospect.state = campaign_sequence
+    prospect.state_status = "Performing"
+    prospect.state_action_start_time = timezone.now()
+    prospect.save()
+
+    if prospect.email and campaign_sequence.google_account and campaign_sequence.google_account.connected:
+        sent = send_email_from_google(add_prospect_info_in_text(campaign_sequence.email_subject, prospect), add_prospect_info_in_text(campaign_sequence.email_message, prospect), prospect.email,
+                                      campaign_sequence.google_account.email, campaign_sequence.google_account.access_token, campaign_sequence)
+
+        if not sent:
+            prospect.state_status = "Failed"
+            prospect.state_action_finish_time = timezone.now()
+            prospect.save()
+            return
+
+        elif prospect.email and campaign_sequence.smtp_account and campaign_sequence.smtp_account.connected:
+
+            try:
+                send_mail(campaign_sequence.smtp_account.server, campaign_sequence.smtp_account.port, campaign_sequence.smtp_account.username, campaign_sequence.smtp_account.password,
+                          campaign_sequence.smtp_account.ssl, prospect.email, add_prospect_info_in_text(campaign_sequence.email_subject, prospect), add_prospect_info_in_text(campaign_sequence.email_message, prospect), campaign_sequence.from_email)
+                sent = True
+            except Exception as e:
+                print(str(e))
+                sent = False
 
             if not sent:
                 prospect.state_status = "Failed"
                 prospect.state_action_finish_time = timezone.now()
                 prospect.save()
-                continue
+                return
 
-            elif prospect.email and campaign_sequence.smtp_account and campaign_sequence.smtp_account.connected:
+    prospect.state = campaign_sequence
+    prospect.state_status = "Finished"
+    prospect.state_action_finish_time = timezone.now()
+    prospect.save()
 
-                try:
-                    send_mail(campaign_sequence.smtp_account.server, campaign_sequence.smtp_account.port, campaign_sequence.smtp_account.username, campaign_sequence.smtp_account.password,
-                              campaign_sequence.smtp_account.ssl, prospect.email, add_prospect_info_in_text(campaign_sequence.email_subject, prospect), add_prospect_info_in_text(campaign_sequence.email_message, prospect), campaign_sequence.from_email)
-                    sent = True
-                except Exception as e:
-                    print(str(e))
-                    sent = False
 
-                if not sent:
-                    prospect.state_status = "Failed"
-                    prospect.state_action_finish_time = timezone.now()
-                    prospect.save()
-                    continue
+def accept_alert(driver):
 
-        prospect.state = campaign_sequence
-        prospect.state_status = "Finished"
-        prospect.state_action_finish_time = timezone.now()
-        prospect.save()
+    try:
+        WebDriverWait(driver, 3).until(EC.alert_is_present())
+        alert = driver.switch_to.alert
+        alert.accept()
+        print("alert accepted")
+    except exceptions.TimeoutException:
+        print("no alert")
 
-        sleep(give_totally_random_number_in_float(60, 120))
 
+def perform_browser_step(driver, prospect, campaign_sequence):
+    ''' One prospect of a browser step, what the step loops used to do between two sleeps '''
 
-def send_connection_request(prospect, campaign_sequence, cookies={}, headers={}, proxies={}):
+    if campaign_sequence.step == "send_inmail":
+        user_account_is_salesnavigator = False if not prospect.linkedin_sales_navigator_profile_url else True
+
+        driver.get(prospect.linkedin_profile_url if not prospect.linkedin_sales_navigator_profile_url else prospect.linkedin_sales_navigator_profile_url)
+
+        sleep(give_totally_random_number_in_float(5, 8))
+
+        if user_account_is_salesnavigator:
+            try:
+                select_sales_navigator_btn = driver.find_element_by_css_selector(
+                    ".action-select-contract")
+                select_sales_navigator_btn.click()
+                sleep(give_totally_random_number_in_float(7, 10))
+            except exceptions.NoSuchElementException:
+                print("no contact chooser screen")
+                pass
+
+        send_inmail(driver, prospect, campaign_sequence,
+                    user_account_is_salesnavigator)
+
+    else:
+        driver.get(prospect.linkedin_profile_url)
+
+        sleep(give_totally_random_number_in_float())
+
+        BROWSER_STEPS[campaign_sequence.step](driver, prospect, campaign_sequence)
+
+    accept_alert(driver)
+
+
+def send_connection_request(prospect, campaign_sequence):
 
     print("sending connection requests")
     prospect.state = campaign_sequence
@@ -1410,14 +1113,14 @@ def send_connection_request(prospect, campaign_sequence, cookies={}, headers={},
     prospect.state_action_start_time = timezone.now()
     prospect.save()
 
-    url = "https://www.linkedin.com/voyager/api/voyagerRelationshipsDashMemberRelationships?action=verifyQuotaAndCreate"
+    url = f"{VOYAGER_API}/voyagerRelationshipsDashMemberRelationships?action=verifyQuotaAndCreate"
     
     payload = json.dumps({
         "inviteeProfileUrn": f"urn:li:fsd_profile:{prospect.entity_urn}",
         "customMessage": add_prospect_info_in_text(campaign_sequence.note, prospect)
     })
     
-    resp = requests.post(url, data=payload, cookies=cookies, headers=headers, proxies=proxies)
+    resp = get_voyager_client(prospect.campaign_linkedin_account.linkedin_account).post(url, data=payload)
     
     if resp.status_code == 200:
         prospect.connection_request_sent = True
@@ -1844,6 +1547,15 @@ def endorse_top_5_skill(driver, prospect, campaign_sequence):
         prospect.save()
 
 
+# step: what perform_browser_step does once the profile is open
+BROWSER_STEPS = {
+    "send_message": send_message,
+    "like_3_posts": like_post,
+    "follow": follow,
+    "endorse_top_5_skills": endorse_top_5_skill,
+}
+
+
 def send_mail(smtp, port, username, password, smtp_ssl, to_email, subject, message, from_email):
     backend = EmailBackend(host=smtp, port=port, username=username,
                            password=password, use_ssl=smtp_ssl, fail_silently=False, timeout=60)
@@ -1896,8 +1608,6 @@ def send_email_from_google(subject, body, to, from_, access_token, campaign_sequ
 
 
 def get_all_prospects_and_save_them_in_to_database(driver, campaign_and_linkedin_account, user_account_is_salesnavigator):
-    prospects = []
-
     if user_account_is_salesnavigator:
         propspect_a_tags = get_elements_with_possibilities(driver, 7, 3,
                                                            {
@@ -1912,7 +1622,7 @@ def get_all_prospects_and_save_them_in_to_database(driver, campaign_and_linkedin
         propspect_a_tags = WebDriverWait(driver, settings.TIMEOUT).until(
             EC.presence_of_all_elements_located((By.CSS_SELECTOR, "span>span>.app-aware-link")))
 
-    count = 0
+    page = []
 
     for prospect in propspect_a_tags:
 
@@ -1941,273 +1651,72 @@ def get_all_prospects_and_save_them_in_to_database(driver, campaign_and_linkedin
         else:
             prospect_data["linkedin_profile_url"] = profile_link
 
-        prospect, created = Prospect.objects.get_or_create(**prospect_data)
+        page.append(prospect_data)
 
-        if blacklist_check(campaign_and_linkedin_account.linkedin_account, prospect):
-            count += 1
-            prospects.append(prospect)
-        else:
-            prospect.delete()
+    # blacklisted ones are dropped before they are saved
+    candidates = blacklist.filter_blacklisted(
+        campaign_and_linkedin_account.linkedin_account, [Prospect(**prospect_data) for prospect_data in page])
+    url_field = "linkedin_sales_navigator_profile_url" if user_account_is_salesnavigator else "linkedin_profile_url"
+    unique = {}
 
-    return count, prospects
+    for prospect in candidates:
+        unique.setdefault(getattr(prospect, url_field), prospect)
 
+    urls = list(unique)
 
-def fill_in_details_of_prospects_and_perform_the_step(driver, campaign_and_linkedin_account, user_account_is_salesnavigator, prospects, cookies={}, headers={}, proxies={}, perform_actions=True):
-
-    campaign_sequences = CampaignSequence.objects.filter(
-        campaign=campaign_and_linkedin_account.campaign).order_by("order")
-
-    for prospect in prospects:
-        print("\n\n", prospect.linkedin_profile_url, "\n\n",
-              prospect.linkedin_sales_navigator_profile_url, "\n\n\n")
-        
-        profile_id = prospect.profile_id
-        profile_url_for_essential_details = f'https://www.linkedin.com/voyager/api/identity/dash/profiles?q=memberIdentity&memberIdentity={profile_id}&decorationId=com.linkedin.voyager.dash.deco.identity.profile.WebTopCardCore-8'
-        profile_url_for_contact_info = f'https://www.linkedin.com/voyager/api/identity/profiles/{profile_id}/profileContactInfo'
-        profile_url_for_school_company_and_profile_urn = f'https://www.linkedin.com/voyager/api/identity/dash/profiles?q=memberIdentity&memberIdentity={profile_id}&decorationId=com.linkedin.voyager.dash.deco.identity.profile.TopCardSupplementary-106'
-        
-        ####################################### essential details ################################
-        
-        resp = requests.get(profile_url_for_essential_details, cookies=cookies, headers = headers, proxies=proxies)
-        essential_details_json = resp.json()
-        
-        first_name = essential_details_json["elements"][0]["firstName"]
-        last_name = essential_details_json["elements"][0]["lastName"]
-        
-        try:
-            headline = essential_details_json["elements"][0]["headline"]
-        except KeyError as e:
-            headline = ""
-            
-        try:
-            location = essential_details_json["elements"][0]["geoLocation"]["geo"]["defaultLocalizedName"]
-        except KeyError as e:
-            location = ""
-        
-        try:
-            profile_image_root = essential_details_json["elements"][0]["profilePicture"]["displayImageReference"]["vectorImage"]["rootUrl"]
-            profile_image_200 = essential_details_json["elements"][0]["profilePicture"]["displayImageReference"]["vectorImage"]["artifacts"][1]["fileIdentifyingUrlPathSegment"]
-            profile_image = f"{profile_image_root}{profile_image_200}"
-        except KeyError as e:
-            profile_image = ""
-        
-        
-        ####################################### contact info ################################
-        
-        resp = requests.get(profile_url_for_contact_info, cookies=cookies, headers = headers, proxies=proxies)
-        contact_info_json = resp.json()
-        
-        email = contact_info_json.get("emailAddress", "")
-        
-        ####################################### school, company, profile_urn ################################
-        resp = requests.get(profile_url_for_school_company_and_profile_urn, cookies=cookies, headers=headers, proxies=proxies)
-        school_and_company_and_profile_urn_json = resp.json()
-        
-        school = list(map(lambda elem: elem.get("school", {}).get("name", "") or elem.get("schoolName", ""), school_and_company_and_profile_urn_json["elements"][0]["profileTopEducation"]["elements"])) or [""]
-        school = school[0]
-        
-        company = list(map(lambda elem: elem.get("company", {}).get("name", "") or elem.get("companyName", ""), school_and_company_and_profile_urn_json["elements"][0]["profileTopPosition"]["elements"])) or [""]
-        company = company[0]
-        
-        profile_urn = school_and_company_and_profile_urn_json["elements"][0]["entityUrn"]
-        
-        
-        ####################################### bio, occupation ################################
-        profile_url_for_bio_and_occupation = f'https://www.linkedin.com/voyager/api/graphql?includeWebMetadata=true&variables=(profileUrn:{urllib.parse.quote_plus(profile_urn)})&&queryId=voyagerIdentityDashProfileCards.817fd31c31e97c7c17c9cd5d44c6edea'
-        resp = requests.get(profile_url_for_bio_and_occupation, cookies=cookies, headers = headers, proxies=proxies)
-        bio_and_occupation_json = resp.json()
-        
-        bio = [elem["topComponents"][1]["components"]["textComponent"]["text"]["text"] for elem in bio_and_occupation_json["data"]["identityDashProfileCardsByInitialCards"]["elements"] if "ABOUT" in elem["entityUrn"] and elem["topComponents"]]
-        bio = bio or [""]
-        bio = bio[0]
-
-        occupation = [elem["topComponents"][1]["components"]["fixedListComponent"]["components"][0]["components"]["entityComponent"]["title"]["text"] for elem in bio_and_occupation_json["data"]["identityDashProfileCardsByInitialCards"]["elements"] if "EXPERIENCE" in elem["entityUrn"] and elem["topComponents"]]
-        occupation = occupation or [""]
-        occupation = occupation[0].split(" at ")[0]
-        
-        prospect.first_name = first_name
-        prospect.last_name = last_name
-        prospect.name = f"{first_name} {last_name}"
-        prospect.bio = bio
-        prospect.occupation = occupation
-        prospect.current_company = company
-        prospect.school_university = school
-        prospect.headline = headline
-        prospect.location = location
-        prospect.fully_crawled = True
-        prospect.entity_urn = profile_urn.split("fsd_profile:")[-1]
-
-        if profile_image:
-            get_avatar(profile_image, prospect)
-
-        get_email(email, prospect)
-
-        prospect.save()
-        
-        if not blacklist_check(campaign_and_linkedin_account.linkedin_account, prospect):
-            prospect.delete()
-            continue
-        
-        if not perform_actions:
-            sleep(give_totally_random_number_in_float(60, 120))
-            continue
-
-        try:
-            sleep(give_totally_random_number_in_float(20, 35))
-            for campaign_sequence in campaign_sequences:
-
-                if (prospect.state_action_finish_time) and not (((timezone.now() - prospect.state_action_finish_time).total_seconds() / 3600) >= campaign_sequence.delay_in_hours + (campaign_sequence.delay_in_days*24)):
-                    print(
-                        f"Will not perform action because of duration {(timezone.now() - prospect.state_action_finish_time).total_seconds() / 3600}")
-                    continue
-
-                if campaign_sequence.step == "send_connection_request":
-
-                    if prospect.state:
-
-                        if prospect.state == campaign_sequence or prospect.state.order >= campaign_sequence.order:
-                            print("Will Not Send Connection Request\n\n")
-                            continue
-
-                    send_connection_request(prospect, campaign_sequence, cookies, headers, proxies)
-
-                elif campaign_sequence.step == "send_message":
-                    if prospect.state:
-
-                        if prospect.state == campaign_sequence or prospect.state.order >= campaign_sequence.order:
-                            print("Will Not Send Message\n\n")
-                            continue
-
-                    if campaign_sequence.wait_for_connection_request_to_be_approved and not prospect.connected:
-                        break
-
-                    driver.get(prospect.linkedin_profile_url)
-
-                    sleep(give_totally_random_number_in_float())
-
-                    send_message(driver, prospect, campaign_sequence)
-
-                elif campaign_sequence.step == "send_inmail":
-
-                    if prospect.state:
-
-                        if prospect.state == campaign_sequence or prospect.state.order >= campaign_sequence.order:
-                            print("Will Not Send In Mail\n\n")
-                            continue
-
-                    if user_account_is_salesnavigator:
-                        driver.get(
-                            prospect.linkedin_sales_navigator_profile_url)
-                    else:
-                        driver.get(prospect.linkedin_profile_url)
-
-                    sleep(give_totally_random_number_in_float())
-
-                    send_inmail(driver, prospect, campaign_sequence,
-                                user_account_is_salesnavigator)
-
-                elif campaign_sequence.step == "like_3_posts":
-
-                    if prospect.state:
-
-                        if prospect.state == campaign_sequence or prospect.state.order >= campaign_sequence.order:
-                            print("Will Not Like 3 Posts\n\n")
-                            continue
-
-                    driver.get(prospect.linkedin_profile_url)
-
-                    sleep(give_totally_random_number_in_float())
-
-                    like_post(driver, prospect, campaign_sequence)
-
-                elif campaign_sequence.step == "follow":
-
-                    if prospect.state:
-
-                        if prospect.state == campaign_sequence or prospect.state.order >= campaign_sequence.order:
-                            print("Will Not follow\n\n")
-                            continue
-
-                    driver.get(prospect.linkedin_profile_url)
-
-                    sleep(give_totally_random_number_in_float())
-
-                    follow(driver, prospect, campaign_sequence)
-
-                elif campaign_sequence.step == "endorse_top_5_skills":
+    existing = {
+        getattr(prospect, url_field): prospect
+        for prospect in Prospect.objects.filter(campaign_linkedin_account=campaign_and_linkedin_account, **{f"{url_field}__in": urls})
+    }
+    created = create_prospects([prospect for url, prospect in unique.items() if url not in existing])
 
-                    if prospect.state:
+    if any(prospect.pk is None for prospect in created):
+        # only some databases return the ids of a bulk insert
+        created = Prospect.objects.filter(
+            campaign_linkedin_account=campaign_and_linkedin_account,
+            **{f"{url_field}__in": [getattr(prospect, url_field) for prospect in created]}
+        )
 
-                        if prospect.state == campaign_sequence or prospect.state.order >= campaign_sequence.order:
-                            print("Will Not Endorese Top 5 Skills\n\n")
-                            continue
-                        
-                    if campaign_sequence.wait_for_connection_request_to_be_approved and not prospect.connected:
-                        break
+    existing.update((getattr(prospect, url_field), prospect) for prospect in created)
+    prospects = [existing[url] for url in urls if url in existing]
 
-                    driver.get(prospect.linkedin_profile_url)
+    return len(prospects), prospects
 
-                    sleep(give_totally_random_number_in_float())
 
-                    endorse_top_5_skill(driver, prospect, campaign_sequence)
+def enrich_prospects(campaign_and_linkedin_account, prospects):
+    ''' HTTP only, fills in the details of the prospects and marks them fully crawled.
+        The sequence steps pick fully crawled prospects up from there. '''
 
-                elif campaign_sequence.step == "send_email":
+    enriched = []
+    avatars = []
 
-                    if prospect.state:
+    profile_records = iter_profile_records(
+        prospects, campaign_and_linkedin_account.linkedin_account)
 
-                        if prospect.state == campaign_sequence or prospect.state.order >= campaign_sequence.order:
-                            print("Will Not Send Email\n\n")
-                            continue
+    for prospect, profile_record in profile_records:
+        print("\n\n", prospect.linkedin_profile_url, "\n\n",
+              prospect.linkedin_sales_navigator_profile_url, "\n\n\n")
 
-                    prospect.state = campaign_sequence
-                    prospect.state_status = "Performing"
-                    prospect.state_action_start_time = timezone.now()
-                    prospect.save()
+        profile_record.apply(prospect)
 
-                    if prospect.email and campaign_sequence.google_account and campaign_sequence.google_account.connected:
-                        sent = send_email_from_google(add_prospect_info_in_text(campaign_sequence.email_subject, prospect), add_prospect_info_in_text(campaign_sequence.email_message, prospect), prospect.email,
-                                                        campaign_sequence.google_account.email, campaign_sequence.google_account.access_token, campaign_sequence)
+        get_email(profile_record.email, prospect)
 
-                        if not sent:
-                            prospect.state_status = "Failed"
-                            prospect.state_action_finish_time = timezone.now()
-                            prospect.save()
-                            continue
+        if not blacklist_check(campaign_and_linkedin_account.linkedin_account, prospect):
+            prospect.delete()
+            continue
 
-                    elif prospect.email and campaign_sequence.smtp_account and campaign_sequence.smtp_account.connected:
+        prospect.save()
 
-                        try:
-                            send_mail(campaign_sequence.smtp_account.server, campaign_sequence.smtp_account.port, campaign_sequence.smtp_account.username, campaign_sequence.smtp_account.password,
-                                        campaign_sequence.smtp_account.ssl, prospect.email, add_prospect_info_in_text(campaign_sequence.email_subject, prospect), add_prospect_info_in_text(campaign_sequence.email_message, prospect), campaign_sequence.from_email)
-                            sent = True
-                        except Exception as e:
-                            print(str(e))
-                            sent = False
+        enriched.append(prospect)
 
-                        if not sent:
-                            prospect.state_status = "Failed"
-                            prospect.state_action_finish_time = timezone.now()
-                            prospect.save()
-                            continue
+        if profile_record.profile_image:
+            avatars.append((prospect.id, profile_record.profile_image))
 
-                    prospect.state_status = "Finished"
-                    prospect.state_action_finish_time = timezone.now()
-                    prospect.save()
-                    continue
+    if avatars:
+        # by name, the task module imports this one
+        current_app.send_task("fetch_prospect_avatars", args=[avatars])
 
-                try:
-                    WebDriverWait(driver, 3).until(EC.alert_is_present())
-                    alert = driver.switch_to.alert
-                    alert.accept()
-                    print("alert accepted")
-                except exceptions.TimeoutException:
-                    print("no alert")
-        except Exception as e:
-            print(str(e), "Campaign Prospect Failed!....",
-                  prospect.linkedin_sales_navigator_profile_url, prospect.name)
-            continue
-        
-        sleep(give_totally_random_number_in_float(60, 120))
+    return enriched
 
 
 def post_an_image(driver, sequence):
@@ -1,7 +1,7 @@
 from platform import platform
 from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
-from django.db.models import Count, F
+from django.db.models import F
 from rest_framework.generics import ListCreateAPIView, ListAPIView, RetrieveUpdateDestroyAPIView, CreateAPIView
 from .serializers import CampaignSerializer, CampaignRetrieveSerializer, ProspectSerializer, SearchParameterSerializer, MessageSerializer, RoomSerializer, CampaignLinkedinAccountSerializer, LabelSerializer, CampaignSequenceSerializer, AssignLabelsSerializer
 from main.models import Campaign, EmailWebHook, Prospect, SearchParameter, CeleryJob, CampaignSequence, Message, Room, Label, ProspectLabel
@@ -13,6 +13,8 @@ from .tasks import perform_campaign_actions, run_outreach_campaign, check_user_c
 from rest_framework import filters
 from django_filters.rest_framework import DjangoFilterBackend
 from celery.task.control import revoke
+from .pagination import KeysetPagination, NDJSONStreamMixin
+from .search import FullTextSearchFilter
 from django.db.models import Q
 from rest_framework.permissions import AllowAny
 from django.db.models import Sum
@@ -69,22 +71,29 @@ class CampaignSequenceListCreateAPIView(ListCreateAPIView):
         return CampaignSequence.objects.filter(campaign__user=self.request.user)
 
 
-class ProspectListAPIView(ListAPIView):
+class ProspectListAPIView(NDJSONStreamMixin, ListAPIView):
     serializer_class = ProspectSerializer
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend]
     search_fields = ['name', "headline", "location",
                      "email", "phone", "campaign_linkedin_account__campaign__name"]
+    search_icontains_fields = ["email", "phone", "campaign_linkedin_account__campaign__name"]
     filterset_fields = ['campaign_linkedin_account__campaign', 'name', 'show_inside_inbox', "prospect_labels__label"]
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-updated_at", "id")
 
     def get_queryset(self):
-        return Prospect.objects.filter(campaign_linkedin_account__campaign__user=self.request.user).order_by("-updated_at").distinct()
+        return Prospect.objects.filter(campaign_linkedin_account__campaign__user=self.request.user).select_related(
+            "campaign_linkedin_account", "state"
+        ).prefetch_related("prospect_labels__label").order_by("-updated_at").distinct()
 
 
-class RoomListAPIView(ListAPIView):
+class RoomListAPIView(NDJSONStreamMixin, ListAPIView):
     serializer_class = RoomSerializer
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ["prospect__name",]
     filterset_fields = ['platform', "linkedin_account", ]
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         
@@ -116,10 +125,10 @@ class RoomListAPIView(ListAPIView):
         queryset = Room.objects.filter(linkedin_account__profile__user=self.request.user).filter(campaign_filters & label_filters & platform_filters).distinct()
         
         if "Readed" in include_message_types:
-            queryset = queryset.filter(messages__message_from="Prospect").annotate(diff = Count("messages") - F("customer_message_readed")).filter(diff__lte=0)
+            queryset = queryset.filter(prospect_message_count__gt=0, unread_count=0)
             
         if "Unreaded" in include_message_types:
-            queryset = queryset.filter(messages__message_from="Prospect").annotate(diff = Count("messages") - F("customer_message_readed")).filter(diff__gt=0)
+            queryset = queryset.filter(unread_count__gt=0)
 
         return queryset.order_by("-created_at")
     
@@ -131,21 +140,23 @@ class RoomReadAPIView(APIView):
     def post(self, request, room_id, format=None):
         room = get_object_or_404(Room, id = room_id, linkedin_account__profile__user=self.request.user)
         
-        room.customer_message_readed = room.messages.filter(message_from="Prospect").count()
-        room.save()
+        Room.objects.filter(id=room.id).update(customer_message_readed=F("prospect_message_count"), unread_count=0)
             
         return Response({}, status=status.HTTP_200_OK)
 
 
-class MessageListAPIView(ListCreateAPIView):
+class MessageListAPIView(NDJSONStreamMixin, ListCreateAPIView):
     serializer_class = MessageSerializer
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['room__name', "message"]
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend]
+    search_fields = ["message"]
     filterset_fields = ["room", 'room__linkedin_account',
                         'message_from', 'room__platform']
+    pagination_class = KeysetPagination
+    keyset_ordering = ("created_at", "id")
 
     def perform_create(self, serializer):
         message = serializer.save(message_from="User")
+        Room.objects.filter(id=message.room_id).update(last_message_at=message.created_at)
         send_message.delay(f"{message.id}")
 
     def get_queryset(self):
@@ -283,13 +294,8 @@ class AssignLabelsAPIView(APIView):
 class FullInboxCountAPIView(APIView):
 
     def get(self, request, format=None):
-        rooms = Room.objects.filter(linkedin_account__profile__user = request.user).annotate(
-            total_customer_messages = Count('messages', filter=Q(messages__message_from="Prospect"))
-        ).all()
-        
-        total_customer_messages = rooms.aggregate(Sum('total_customer_messages'))["total_customer_messages__sum"] or 0
-        customer_message_readed = rooms.aggregate(Sum('customer_message_readed'))["customer_message_readed__sum"] or 0
+        count = Room.objects.filter(linkedin_account__profile__user = request.user).aggregate(Sum('unread_count'))["unread_count__sum"]
         
         return Response({
-            "count": (total_customer_messages - customer_message_readed) or 0
+            "count": count or 0
         }, status=status.HTTP_200_OK)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from main.models import Campaign
+from main.api.stats import rebuild_campaigns_stats
+
+
+class Command(BaseCommand):
+    help = "Recounts the stored dashboard counters of the campaigns from their prospects"
+
+    def add_arguments(self, parser):
+        parser.add_argument("campaign_ids", nargs="*", type=int)
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        campaign_ids = options["campaign_ids"] or list(Campaign.objects.order_by("id").values_list("id", flat=True))
+        batch_size = options["batch_size"]
+
+        for index in range(0, len(campaign_ids), batch_size):
+            rebuild_campaigns_stats(campaign_ids[index:index + batch_size])
+
+        self.stdout.write(f"Rebuilt stats of {len(campaign_ids)} campaigns")
@@ -0,0 +1,35 @@
+# Generated by Django 3.2 on 2026-10-18 10:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0048_alter_label_color'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_prospects_crawled', models.IntegerField(default=0)),
+                ('total_prospects_fully_crawled', models.IntegerField(default=0)),
+                ('total_connection_request_sent', models.IntegerField(default=0)),
+                ('total_connection_request_accepted', models.IntegerField(default=0)),
+                ('total_prospects_lead', models.IntegerField(default=0)),
+                ('total_prospects_customer', models.IntegerField(default=0)),
+                ('message_sent', models.IntegerField(default=0)),
+                ('inmail_sent', models.IntegerField(default=0)),
+                ('email_sent', models.IntegerField(default=0)),
+                ('liked_posts', models.IntegerField(default=0)),
+                ('followed', models.IntegerField(default=0)),
+                ('endorsed', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('campaign', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='main.campaign')),
+            ],
+        ),
+    ]
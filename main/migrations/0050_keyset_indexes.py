@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0049_campaignstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['created_at', 'id'], name='main_messag_created_2c8756_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prospect',
+            index=models.Index(fields=['-updated_at', 'id'], name='main_prospe_updated_15bd94_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['-created_at', '-id'], name='main_room_created_b8929e_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0050_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prospect',
+            name='linkedin_avatar_source_url',
+            field=models.URLField(blank=True, db_index=True, max_length=2000, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0051_prospect_linkedin_avatar_source_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile_id', models.CharField(max_length=700, unique=True)),
+                ('entity_urn', models.CharField(db_index=True, max_length=700)),
+                ('first_name', models.TextField(blank=True)),
+                ('last_name', models.TextField(blank=True)),
+                ('headline', models.TextField(blank=True)),
+                ('location', models.TextField(blank=True)),
+                ('profile_image', models.TextField(blank=True)),
+                ('school', models.TextField(blank=True)),
+                ('company', models.TextField(blank=True)),
+                ('profile_urn', models.TextField(blank=True)),
+                ('bio', models.TextField(blank=True)),
+                ('occupation', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0052_profilesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,66 @@
+from datetime import timedelta
+from hashlib import sha256
+from django.db import migrations
+
+
+def get_message_key(message_from, time, message, occurrence):
+    # same as main.api.conversations.get_message_key at the time of writing
+    return sha256(f"{message_from}\x00{time}\x00{message}\x00{occurrence}".encode()).hexdigest()
+
+
+# the scraper deleted a room's messages and created them all again one after another, a longer pause means the
+# rest of the room was sent from the app afterwards
+SCRAPE_GAP = timedelta(seconds=60)
+
+
+def backfill_message_keys(apps, schema_editor):
+    ''' Keys the messages of each room's last scrape. Messages sent from the app after it are left without a key,
+        so they are taken over by their scraped copy instead of being duplicated. '''
+
+    Message = apps.get_model("main", "Message")
+    batch = []
+    room_id = None
+    occurrences = {}
+    scraped = True
+    previous_created_at = None
+
+    for message in Message.objects.filter(key__isnull=True).order_by("room_id", "id").only(
+        "id", "room_id", "message_from", "time", "message", "created_at"
+    ).iterator(chunk_size=2000):
+
+        if message.room_id != room_id:
+            room_id = message.room_id
+            occurrences = {}
+            scraped = True
+            previous_created_at = None
+
+        if previous_created_at and message.created_at - previous_created_at > SCRAPE_GAP:
+            scraped = False
+
+        previous_created_at = message.created_at
+
+        # only scrapes create prospect messages
+        if not scraped and message.message_from == "User":
+            continue
+
+        value = (message.message_from, message.time, message.message)
+        occurrences[value] = occurrences.get(value, -1) + 1
+        message.key = get_message_key(*value, occurrences[value])
+        batch.append(message)
+
+        if len(batch) >= 2000:
+            Message.objects.bulk_update(batch, ["key"])
+            batch = []
+
+    Message.objects.bulk_update(batch, ["key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0053_message_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_message_keys, migrations.RunPython.noop),
+    ]
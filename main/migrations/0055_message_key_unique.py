@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0054_backfill_message_key'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='message',
+            unique_together={('room', 'key')},
+        ),
+    ]
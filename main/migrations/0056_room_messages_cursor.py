@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0055_message_key_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='messages_cursor',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
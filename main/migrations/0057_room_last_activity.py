@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0056_room_messages_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='last_seen_marker',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
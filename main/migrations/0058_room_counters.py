@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0057_room_last_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='prospect_message_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='unread_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['linkedin_account', 'unread_count'], name='main_room_linkedi_5621dc_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def backfill_room_counters(apps, schema_editor):
+    Room = apps.get_model("main", "Room")
+    Message = apps.get_model("main", "Message")
+
+    prospect_messages = Message.objects.filter(room=OuterRef("pk"), message_from="Prospect").order_by().values(
+        "room").annotate(count=Count("id")).values("count")
+    last_messages = Message.objects.filter(room=OuterRef("pk")).order_by().values("room").annotate(
+        last=Max("created_at")).values("last")
+
+    Room.objects.update(
+        prospect_message_count=Coalesce(Subquery(prospect_messages, output_field=IntegerField()), Value(0)),
+        last_message_at=Subquery(last_messages),
+    )
+    Room.objects.update(unread_count=Greatest(F("prospect_message_count") - F("customer_message_readed"), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0058_room_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_room_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+from django.db import migrations
+
+
+# table: columns of its search document, same as main.api.search.SEARCH_DOCUMENTS at the time of writing
+SEARCH_DOCUMENTS = {
+    "main_message": ("message",),
+    "main_prospect": ("name", "headline", "location"),
+}
+
+
+def get_postgres_sql(table, columns):
+    document = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+
+    return [f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_search_idx ON {table} USING GIN (to_tsvector('simple', {document}))"]
+
+
+def get_sqlite_sql(table, columns):
+    ''' External content FTS5 table kept in sync with the table by triggers, then filled from it '''
+
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    for table, columns in SEARCH_DOCUMENTS.items():
+        if vendor == "postgresql":
+            statements = get_postgres_sql(table, columns)
+        elif vendor == "sqlite":
+            statements = get_sqlite_sql(table, columns)
+        else:
+            # the search endpoints fall back to icontains
+            statements = []
+
+        for statement in statements:
+            schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    for table in SEARCH_DOCUMENTS:
+        if vendor == "postgresql":
+            schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {table}_search_idx")
+        elif vendor == "sqlite":
+            for trigger in ("insert", "delete", "update"):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{trigger}")
+
+            schema_editor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+class Migration(migrations.Migration):
+    # postgres can't build an index concurrently inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('main', '0059_backfill_room_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
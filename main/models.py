@@ -289,6 +289,27 @@ class Campaign(models.Model):
         return f"{self.name}"
 
 
+class CampaignStats(models.Model):
+    campaign = models.OneToOneField(Campaign, on_delete=models.CASCADE, related_name="stats")
+    total_prospects_crawled = models.IntegerField(default=0)
+    total_prospects_fully_crawled = models.IntegerField(default=0)
+    total_connection_request_sent = models.IntegerField(default=0)
+    total_connection_request_accepted = models.IntegerField(default=0)
+    total_prospects_lead = models.IntegerField(default=0)
+    total_prospects_customer = models.IntegerField(default=0)
+    message_sent = models.IntegerField(default=0)
+    inmail_sent = models.IntegerField(default=0)
+    email_sent = models.IntegerField(default=0)
+    liked_posts = models.IntegerField(default=0)
+    followed = models.IntegerField(default=0)
+    endorsed = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.campaign.name}"
+
+
 class CampaignLinkedinAccount(models.Model):
     campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE)
     linkedin_account = models.ForeignKey(LinkedinAccount, on_delete=models.CASCADE)
@@ -445,6 +466,8 @@ class Prospect(models.Model):
         blank=True, null=True)
     linkedin_avatar = models.ImageField(
         upload_to="", blank=True, null=True)
+    # where linkedin_avatar was downloaded from, it isn't downloaded again while this stays the same
+    linkedin_avatar_source_url = models.URLField(max_length=2000, blank=True, null=True, db_index=True)
     fully_crawled = models.BooleanField(default=False)
     connection_request_sent = models.BooleanField(default=False)
     connected = models.BooleanField(default=False)
@@ -472,6 +495,32 @@ class Prospect(models.Model):
         else:
             return None
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-updated_at", "id"]),
+        ]
+
+
+# public part of a linkedin profile as last crawled, shared by every prospect of the same person
+class ProfileSnapshot(models.Model):
+    profile_id = models.CharField(max_length=700, unique=True)
+    entity_urn = models.CharField(max_length=700, db_index=True)
+    first_name = models.TextField(blank=True)
+    last_name = models.TextField(blank=True)
+    headline = models.TextField(blank=True)
+    location = models.TextField(blank=True)
+    profile_image = models.TextField(blank=True)
+    school = models.TextField(blank=True)
+    company = models.TextField(blank=True)
+    profile_urn = models.TextField(blank=True)
+    bio = models.TextField(blank=True)
+    occupation = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.profile_id}"
+
 
 class ProspectLabel(models.Model):
     prospect = models.ForeignKey(Prospect, on_delete=models.CASCADE, related_name="prospect_labels")
@@ -527,7 +576,17 @@ class Room(models.Model):
     prospect = models.ForeignKey(Prospect, on_delete=models.CASCADE, null = True)
     message_thread = models.URLField()
     customer_message_readed = models.IntegerField(default=0)
+    # kept up to date by save_conversation and RoomReadAPIView, the inbox reads them instead of counting messages
+    prospect_message_count = models.IntegerField(default=0)
+    unread_count = models.IntegerField(default=0)
+    last_message_at = models.DateTimeField(blank=True, null=True)
     platform = models.CharField(max_length=14, choices=platform_choices)
+    # createdAt, in ms, of the newest event synced over the voyager api
+    messages_cursor = models.BigIntegerField(blank=True, null=True)
+    # lastActivityAt of the conversation on linkedin, only the voyager sync knows it
+    last_activity_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    # fingerprint of the thread in the inbox list when it was last opened
+    last_seen_marker = models.CharField(max_length=64, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -536,6 +595,10 @@ class Room(models.Model):
     
     class Meta:
         unique_together = ["linkedin_account", "message_thread", "platform", ]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+            models.Index(fields=["linkedin_account", "unread_count"]),
+        ]
 
 
 class Message(models.Model):
@@ -544,12 +607,20 @@ class Message(models.Model):
     message_from = models.CharField(max_length=8, choices=message_from_choices)
     time = models.CharField(max_length=100)
     message = models.TextField()
+    # hash of who, when and what, set on messages scraped from the thread
+    key = models.CharField(max_length=64, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return f"{self.room.prospect.name if self.room.prospect else 'No Name'}"
 
+    class Meta:
+        unique_together = ["room", "key"]
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+        ]
+
 
 class EmailWebHook(models.Model):
     id = models.UUIDField(default=uuid4, primary_key=True, unique = True)
@@ -1,13 +1,137 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_init, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import Campaign, CeleryJob
+from .models import Campaign, CeleryJob, CampaignStats, CampaignSequence, Prospect, ProspectLabel, Label
+from .api.stats import (
+    PROSPECT_STATS_FIELDS, get_prospect_stats_values, get_prospect_stats_delta,
+    update_campaign_stats, rebuild_campaigns_stats
+)
 from celery.task.control import revoke
 
 
+STATS_LABELS = {
+    "Lead": "total_prospects_lead",
+    "Customer": "total_prospects_customer",
+}
+
+
 @receiver(post_save, sender=Campaign)
 def stop_campaign(sender, instance, created, *args, **kwargs):
-    
+
     if instance.status == "Stopped":
         print("Stopping Campaign")
         for job in CeleryJob.objects.filter(campaign=instance):
-            revoke(job.task_id, terminate=True)
\ No newline at end of file
+            revoke(job.task_id, terminate=True)
+
+
+@receiver(post_save, sender=Campaign)
+def create_campaign_stats(sender, instance, created, *args, **kwargs):
+
+    if created:
+        CampaignStats.objects.get_or_create(campaign=instance)
+
+
+@receiver(post_init, sender=Prospect)
+def remember_prospect_stats_values(sender, instance, *args, **kwargs):
+    instance._stats_values = get_prospect_stats_values(instance)
+
+
+def get_saved_prospect_campaign_id(prospect):
+    # from the database, the instance may not have the field loaded
+    return Prospect.objects.filter(id=prospect.id).values_list("campaign_linkedin_account__campaign_id", flat=True).first()
+
+
+@receiver(post_save, sender=Prospect)
+def update_prospect_campaign_stats(sender, instance, created, update_fields=None, *args, **kwargs):
+    old_values = None if created else instance._stats_values
+    new_values = get_prospect_stats_values(instance)
+
+    if update_fields is not None:
+        saved = {sender._meta.get_field(field).attname for field in update_fields}
+
+        if not saved & set(PROSPECT_STATS_FIELDS):
+            return
+
+        if old_values is not None and new_values is not None:
+            new_values = {field: new_values[field] if field in saved else old_values[field] for field in PROSPECT_STATS_FIELDS}
+
+    if not created and old_values is None:
+        # loaded with deferred fields, there is nothing to diff against
+        campaign_id = get_saved_prospect_campaign_id(instance)
+
+        if campaign_id is not None:
+            rebuild_campaigns_stats([campaign_id])
+    else:
+        for campaign_id, delta in get_prospect_stats_delta(old_values, new_values).items():
+            if not update_campaign_stats(campaign_id, delta):
+                rebuild_campaigns_stats([campaign_id])
+
+    instance._stats_values = new_values
+
+
+@receiver(pre_delete, sender=Prospect)
+def remember_deleted_prospect_campaign(sender, instance, *args, **kwargs):
+
+    if instance._stats_values is None:
+        instance._stats_campaign_id = get_saved_prospect_campaign_id(instance)
+
+
+@receiver(post_delete, sender=Prospect)
+def remove_prospect_campaign_stats(sender, instance, *args, **kwargs):
+    # what was counted for the prospect, changes made to the instance since its last save never were
+    if instance._stats_values is None:
+        if instance._stats_campaign_id is not None:
+            rebuild_campaigns_stats([instance._stats_campaign_id], create=False)
+
+        return
+
+    for campaign_id, delta in get_prospect_stats_delta(instance._stats_values, None).items():
+        update_campaign_stats(campaign_id, delta)
+
+
+def update_label_campaign_stats(prospect_label, change):
+    counter = STATS_LABELS.get(prospect_label.label.name)
+
+    if counter:
+        campaign_id = Prospect.objects.filter(id=prospect_label.prospect_id).values_list(
+            "campaign_linkedin_account__campaign_id", flat=True
+        ).first()
+        update_campaign_stats(campaign_id, {counter: change})
+
+
+@receiver(post_save, sender=ProspectLabel)
+def add_label_campaign_stats(sender, instance, created, *args, **kwargs):
+
+    if created:
+        update_label_campaign_stats(instance, 1)
+
+
+@receiver(post_delete, sender=ProspectLabel)
+def remove_label_campaign_stats(sender, instance, *args, **kwargs):
+    update_label_campaign_stats(instance, -1)
+
+
+@receiver(post_init, sender=Label)
+def remember_label_name(sender, instance, *args, **kwargs):
+    instance._stats_name = instance.__dict__.get("name")
+
+
+@receiver(post_save, sender=Label)
+def rename_label_campaign_stats(sender, instance, created, update_fields=None, *args, **kwargs):
+
+    if created or update_fields is not None and "name" not in update_fields:
+        return
+
+    old_name, instance._stats_name = instance._stats_name, instance.name
+
+    # only the labels with a counter matter, and only when they are renamed to or from it
+    if old_name != instance.name and (old_name in STATS_LABELS or instance.name in STATS_LABELS):
+        rebuild_campaigns_stats(
+            Prospect.objects.filter(prospect_labels__label=instance).values_list("campaign_linkedin_account__campaign_id", flat=True).distinct(),
+            create=False,
+        )
+
+
+@receiver([post_save, post_delete], sender=CampaignSequence)
+def update_sequence_campaign_stats(sender, instance, *args, **kwargs):
+    # step counters depend on where each step sits in the sequence
+    rebuild_campaigns_stats([instance.campaign_id], create=False)
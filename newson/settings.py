@@ -161,6 +161,7 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "mediafiles")
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 COOKIES_FOLDER = "cookies"
 COOKIES_ROOT = os.path.join(MEDIA_ROOT, COOKIES_FOLDER)
+CHROMEDRIVER_CACHE_FILE = os.getenv("CHROMEDRIVER_CACHE_FILE", os.path.join(BASE_DIR, "chromedriver", "chromedriver.json"))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -220,6 +221,18 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = os.getenv("CELERY_TIMEZONE")
+# rate limits and locks, an empty value keeps them in process memory
+REDIS_URL = os.getenv("REDIS_URL", BROKER_URL)
+# chrome bound tasks stay on the default queue, http only work has its own workers
+CELERY_DEFAULT_QUEUE = "browser"
+CELERY_ROUTES = {
+    "enrich_campaign_prospects": {"queue": "enrichment"},
+    "record_campaign_actions": {"queue": "enrichment"},
+    "reconcile_linkedin_account_connections": {"queue": "enrichment"},
+    "fetch_prospect_avatars": {"queue": "enrichment"},
+}
+# paced actions wait in the broker until their eta, they mustn't be redelivered meanwhile
+BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 2 * 60 * 60}
 
 ### CUSTOM CONFIG ###
 TIMEOUT = 10
@@ -228,6 +241,27 @@ TOTAL_CONNECTION_REQUESTS_PER_DAY = 45
 TOTAL_ACTION_WITH_PROSPECTS_PER_DAY = 45
 FULLY_CRAWL_PERFORM_ACTION_LIMIT = 5
 TOTAL_RETRIES = 3
+ENRICHMENT_CONCURRENCY_PER_ACCOUNT = 3
+ENRICHMENT_MIN_REQUEST_INTERVAL = 0.5
+ENRICHMENT_PREFETCH_PROSPECTS = 1
+BROWSER_POOL_MAX_SIZE = 2
+BROWSER_POOL_IDLE_SECONDS = 15 * 60
+BROWSER_POOL_MAX_MEMORY_MB = 512
+CAMPAIGN_ACTIONS_MAX_CONCURRENCY = int(os.getenv("CAMPAIGN_ACTIONS_MAX_CONCURRENCY", 8))
+LOCK_LEASE_TTL = 5 * 60
+# seconds between two actions of a linkedin account, and how far ahead they are scheduled
+PACING_MIN_GAP = 60
+PACING_MAX_GAP = 120
+PACING_HORIZON = 55 * 60
+# a step still Performing this long after its slot lost its task, e.g. to a broker restart
+PACING_LOST_STEP_AFTER = 3 * 60 * 60
+CONNECTIONS_RECONCILE_DAYS = 7
+VOYAGER_POOL_SIZE = 4
+VOYAGER_RETRIES = 3
+VOYAGER_BACKOFF_FACTOR = 2
+AVATAR_DOWNLOAD_CONCURRENCY = 8
+PROFILE_SNAPSHOT_TTL_DAYS = 30
+MESSAGING_SYNC_MAX_PAGES = 5
 
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
 